@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from http_cache import CACHE_DIR, open_db
+
+# Nombre max d'analyses gardées en mémoire (par process) et sur disque
+MEMORY_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MEMORY_ENTRIES", 128))
+DISK_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_DISK_ENTRIES", 2000))
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def config_hash(themes_definitions, stopwords, exclude, *options):
+    """Empreinte de la configuration d'analyse : la changer invalide le cache."""
+    payload = json.dumps(
+        [list(themes_definitions.items()), sorted(stopwords), sorted(exclude), *options],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Cache des résultats d'analyse, partagé entre sessions Streamlit.
+
+    Clé = hash du texte extrait + hash de la configuration. Deux niveaux :
+    un LRU en mémoire (process) devant une table SQLite (disque), tous deux
+    bornés en nombre d'entrées.
+    """
+
+    def __init__(self, path=None, memory_max=MEMORY_MAX_ENTRIES, disk_max=DISK_MAX_ENTRIES):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "analysis.sqlite")
+        self.memory_max = memory_max
+        self.disk_max = disk_max
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = open_db(path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                results TEXT NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._db.commit()
+
+    def _remember(self, key, results):
+        self._mem[key] = results
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_max:
+            self._mem.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                return self._mem[key]
+            row = self._db.execute("SELECT results FROM analyses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE analyses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            # JSON -> liste de tuples (theme, score, [phrases]) comme scrape_political_site
+            results = [(t, s, list(p)) for t, s, p in json.loads(row[0])]
+            self._remember(key, results)
+            return results
+
+    def put(self, key, results):
+        with self._lock:
+            self._remember(key, results)
+            self._db.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?)",
+                (key, json.dumps(results, ensure_ascii=False), time.time()),
+            )
+            n = self._db.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            if n > self.disk_max:
+                self._db.execute(
+                    "DELETE FROM analyses WHERE key IN (SELECT key FROM analyses ORDER BY last_access LIMIT ?)",
+                    (n - self.disk_max,),
+                )
+            self._db.commit()
+
+    def get_or_compute(self, text, config_key, compute):
+        key = text_hash(text) + ":" + config_key
+        results = self.get(key)
+        if results is None:
+            results = compute(text)
+            self.put(key, results)
+        return results
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_analysis_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnalysisCache()
+        return _cache
@@ -1,68 +1,62 @@
+import time
+_run_started = time.perf_counter()
+
 import streamlit as st
-import os
-import io
-import requests
-import base64
-from abc import ABC, abstractmethod
-from PIL import Image, ImageDraw
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# --- IMPORT UNIQUE ---
-try:
-    from scraper import scrape_political_site, generate_bd_prompt_logic
-except ImportError as e:
-    st.error(f"Erreur d'importation : {e}. Vérifiez que 'scraper.py' est dans le même dossier.")
-    st.stop()
-
 # --- CONFIG ---
-PARTY_URLS = {
-    "rn": ["https://rassemblementnational.fr/22-mesures"],
-    "lfi": ["https://programme.lafranceinsoumise.fr/programme-version-courte/"],
-    "ps": ["https://www.parti-socialiste.fr/le_programme"],
-    "lr": ["https://www.touteleurope.eu/vie-politique-des-etats-membres/elections-legislatives-2024-quel-est-le-programme-des-republicains-sur-l-europe/"],
-    "eeln": ["https://www.latribune.fr/economie/union-europeenne/europeennes-le-programme-de-valerie-hayer-renaissance-en-3-minutes-chrono-999162.html"],
-}
-PARTIS_NOMS = {
-    "Rassemblement National": "rn", "La France Insoumise": "lfi",
-    "Parti Socialiste": "ps", "Les Républicains": "lr",
-    "Renaissance": "eeln", 
-}
-ANGLE_SATIRIQUE = "Économie vs Réalité"
-
-# --- PROVIDERS IMAGE ---
-class ImageProvider(ABC):
-    @abstractmethod
-    def generate_image(self, prompt: str) -> bytes: pass
-
-class DummyProvider(ImageProvider):
-    def generate_image(self, prompt: str) -> bytes:
-        img = Image.new("RGB", (1024, 512), color=(50, 60, 70))
-        d = ImageDraw.Draw(img)
-        d.text((360, 240), "MODE DUMMY\n(Pas de clé API)", fill=(220, 220, 220))
-        buf = io.BytesIO()
-        img.save(buf, format="PNG")
-        return buf.getvalue()
-
-class AzureOpenAIProvider(ImageProvider):
-    def __init__(self, key, endpoint):
-        from openai import AzureOpenAI
-        self.client = AzureOpenAI(api_key=key, azure_endpoint=endpoint, api_version="2024-02-01")
-        self.deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "dall-e-3")
-    def generate_image(self, prompt: str) -> bytes:
-        try:
-            res = self.client.images.generate(model=self.deployment, prompt=prompt[:3900], n=1)
-            if hasattr(res.data[0], 'url') and res.data[0].url: return requests.get(res.data[0].url).content
-            elif hasattr(res.data[0], 'b64_json') and res.data[0].b64_json: return base64.b64decode(res.data[0].b64_json)
-            else: raise ValueError("Erreur Azure: Pas d'image.")
-        except Exception as e:
-            if "content_filter" in str(e): raise ValueError("⚠️ Image censurée par Azure (Sécurité).")
-            raise e
-
-def get_provider():
-    if os.getenv("AZURE_OPENAI_API_KEY"): return AzureOpenAIProvider(os.getenv("AZURE_OPENAI_API_KEY"), os.getenv("AZURE_OPENAI_ENDPOINT"))
-    return DummyProvider()
+from config import PARTY_URLS, PARTIS_NOMS, ANGLE_SATIRIQUE
+from instrumentation import trace
+from prompt_engine import build_bd_prompt
+from refresh import REFRESH_INTERVAL
+
+# --- RESSOURCES PARTAGÉES ---
+# Modules lourds (bs4, requests, lxml, NumPy, PIL, openai) importés au premier
+# usage, puis gardés par st.cache_resource entre reruns et sessions.
+@st.cache_resource(show_spinner=False)
+def load_scraper():
+    """Module d'analyse : automate des mots-clés et index des phrases compilés une fois."""
+    try:
+        import scraper
+    except ImportError as e:
+        st.error(f"Erreur d'importation : {e}. Vérifiez que 'scraper.py' est dans le même dossier.")
+        st.stop()
+    return scraper
+
+@st.cache_resource(show_spinner=False)
+def load_provider():
+    """Provider partagé (client et connexions réutilisés) derrière le cache d'images."""
+    from image_store import get_cached_provider
+    return get_cached_provider()
+
+@st.cache_resource(show_spinner=False)
+def load_jobs():
+    """Pool de tâches de fond partagé par toutes les sessions."""
+    from jobs import get_job_runner
+    return get_job_runner()
+
+@st.cache_resource(show_spinner=False)
+def startup_stats():
+    """Durée du tout premier run du process (démarrage à froid), partagée entre sessions."""
+    return {"cold_ms": None}
+
+@st.cache_resource(show_spinner=False)
+def load_store():
+    from corpus_store import get_store
+    return get_store()
+
+@st.cache_resource(show_spinner=False)
+def load_refresher():
+    """Rafraîchissement incrémental des PARTY_URLS ; démon lancé si REFRESH_INTERVAL > 0."""
+    from refresh import Refresher
+    refresher = Refresher(PARTY_URLS)
+    return refresher.start() if REFRESH_INTERVAL > 0 else refresher
+
+# Démon de rafraîchissement démarré avec le process, pas au premier clic
+if REFRESH_INTERVAL > 0:
+    load_refresher()
 
 # --- INTERFACE ---
 st.set_page_config(page_title="Politique en BD", layout="wide")
@@ -80,38 +74,171 @@ if "analysis_results" not in st.session_state: st.session_state.analysis_results
 if "generated_prompt" not in st.session_state: st.session_state.generated_prompt = ""
 if "generated_image" not in st.session_state: st.session_state.generated_image = None
 if "status_msg" not in st.session_state: st.session_state.status_msg = ""
+if "prompt_pack" not in st.session_state: st.session_state.prompt_pack = None
+if "traces" not in st.session_state: st.session_state.traces = []
+if "logs" not in st.session_state: st.session_state.logs = []
+if "theme_matrix" not in st.session_state: st.session_state.theme_matrix = None
+if "run_times" not in st.session_state: st.session_state.run_times = []
+if "board_panels" not in st.session_state: st.session_state.board_panels = None
+if "jobs" not in st.session_state: st.session_state.jobs = {}   # "scrape" / "image" -> id de job
+
+# Intervalle de rafraîchissement tant qu'une tâche de fond est en cours (secondes)
+POLL_INTERVAL = 0.5
+
+MAX_TRACES = 20
+
+def ui_log(msg, level="info"):
+    st.session_state.logs = (st.session_state.logs + [f"{level.upper()} {msg}"])[-200:]
+
+def keep_trace(t):
+    st.session_state.traces = (st.session_state.traces + [t])[-MAX_TRACES:]
+
+def start_job(kind, key, fn, *args, **kwargs):
+    """Soumet une tâche de fond (en remplaçant celle du même type de cette session)."""
+    runner = load_jobs()
+    previous = st.session_state.jobs.get(kind)
+    if previous: runner.cancel(previous)
+    st.session_state.jobs[kind] = runner.submit(key, fn, *args, name=kind, **kwargs)
+
+def apply_job(kind, job):
+    """Reporte le résultat d'une tâche terminée dans la session."""
+    for level, msg in job.logs: ui_log(msg, level)
+    if job.trace is not None: keep_trace(job.trace)
+    if job.status == "cancelled":
+        st.info("Tâche annulée.")
+    elif job.status == "error":
+        st.error(job.error)
+    elif kind == "scrape":
+        res = job.result
+        if res:
+            st.session_state.analysis_results = res
+            st.session_state.status_msg = f"{sum(len(x[2]) for x in res)} phrases pertinentes."
+        else: st.error("Erreur de scraping.")
+    elif kind == "image":
+        st.session_state.generated_image = job.result
+        st.session_state.board_panels = None
+    elif kind == "board":
+        st.session_state.generated_image, st.session_state.board_panels = job.result
+
+def poll_jobs():
+    """État des tâches de fond de la session : progression, annulation, résultats."""
+    runner = load_jobs()
+    for kind, job_id in list(st.session_state.jobs.items()):
+        job = runner.get(job_id)
+        if job is None:
+            del st.session_state.jobs[kind]
+        elif job.active:
+            last = job.logs[-1][1] if job.logs else "En attente..."
+            st.caption(f"⏳ {kind} ({job.status}) : {last}")
+            if st.button("Annuler", key=f"cancel_{kind}"):
+                runner.cancel(job_id)
+        else:
+            del st.session_state.jobs[kind]
+            apply_job(kind, job)
 
 with st.sidebar:
     st.header("⚙️ Configuration")
     choix = st.selectbox("Parti", list(PARTIS_NOMS.keys()))
     url = st.text_input("URL", value=PARTY_URLS.get(PARTIS_NOMS[choix], [""])[0])
+    crawl_all = st.checkbox("Crawler toutes les pages du parti", value=False)
+    crawl_depth = st.slider("Profondeur (liens du même site)", 0, 2, 0) if crawl_all else 0
+    stream_mode = st.checkbox("Mode streaming (grosses pages)", value=False) if not crawl_all else False
     st.markdown("---")
     
-    # Boutons d'action
+    # Boutons d'action (scraping et image en tâche de fond, partagées entre sessions)
     if st.button("1. Scraper & analyser"):
-        with st.spinner("Analyse..."):
-            res = scrape_political_site(url)
+        scrape = load_scraper().scrape_political_site
+        party = PARTIS_NOMS[choix]
+        if crawl_all:
+            urls = [url] + [u for u in PARTY_URLS.get(party, []) if u != url]
+            start_job("scrape", ("scrape", tuple(urls), crawl_depth, party), scrape, urls, max_depth=crawl_depth, party=party)
+        else:
+            start_job("scrape", ("scrape", url, stream_mode, party), scrape, url, stream=stream_mode, party=party)
+
+    if st.button("Charger depuis le corpus"):
+        # Dernier snapshot archivé : pas de réseau, pas de re-analyse
+        with trace("corpus", log_callback=ui_log) as t:
+            res = load_store().analysis_for_party(PARTIS_NOMS[choix])
             if res:
                 st.session_state.analysis_results = res
-                st.session_state.status_msg = f"{sum(len(x[2]) for x in res)} phrases pertinentes."
-            else: st.error("Erreur de scraping.")
-            
+                st.session_state.status_msg = f"{sum(len(x[2]) for x in res)} phrases (corpus)."
+            else: st.error("Parti absent du corpus : scrapez-le d'abord.")
+        keep_trace(t)
+
+    if st.button("Charger l'analyse rafraîchie"):
+        # Analyse précalculée par le rafraîchissement incrémental (refresh.py)
+        stored = load_refresher().store.party_analysis(PARTIS_NOMS[choix])
+        if stored:
+            res, updated_at, checked_at = stored
+            st.session_state.analysis_results = res
+            st.session_state.status_msg = (f"{sum(len(x[2]) for x in res)} phrases (modifiée le "
+                                           f"{time.strftime('%d/%m %H:%M', time.localtime(updated_at))}, "
+                                           f"vérifiée le {time.strftime('%d/%m %H:%M', time.localtime(checked_at))}).")
+        else:
+            st.info("Pas encore d'analyse rafraîchie pour ce parti (REFRESH_INTERVAL > 0 ou python refresh.py --once).")
+
     if st.session_state.status_msg: st.markdown(f"<div class='success-box'>{st.session_state.status_msg}</div>", unsafe_allow_html=True)
     
     if st.button("2. Générer le prompt"):
         if st.session_state.analysis_results:
-            st.session_state.generated_prompt = generate_bd_prompt_logic(choix, st.session_state.analysis_results, ANGLE_SATIRIQUE)
+            with trace("prompt", log_callback=ui_log) as t:
+                built = build_bd_prompt(choix, st.session_state.analysis_results, ANGLE_SATIRIQUE)
+            if built.no_quotes:
+                st.error(built.prompt)
+            else:
+                st.session_state.generated_prompt = built.prompt
+                st.session_state.prompt_pack = built.pack
+            keep_trace(t)
             
+    force_regen = st.checkbox("Forcer la régénération de l’image", value=False)
+    board_mode = st.checkbox("Planche case par case", value=False)
+    n_panels = st.slider("Nombre de cases", 2, 10, 6) if board_mode else 0
     if st.button("3. Générer l’image"):
-        if st.session_state.generated_prompt:
-            with st.spinner("Génération..."):
-                try: st.session_state.generated_image = get_provider().generate_image(st.session_state.generated_prompt)
-                except Exception as e: st.error(e)
+        if board_mode and st.session_state.analysis_results:
+            # Une image par case (en parallèle), assemblée avec bulles
+            from board import generate_board
+            pack = st.session_state.prompt_pack
+            selected = pack.selected if pack else [(t, p[0]) for t, _, p in st.session_state.analysis_results]
+            start_job("board", ("board", choix, tuple(selected), n_panels, ANGLE_SATIRIQUE),
+                      generate_board, load_provider(), choix, selected, n_panels, ANGLE_SATIRIQUE)
+        elif st.session_state.generated_prompt:
+            prompt = st.session_state.generated_prompt
+            start_job("image", ("image", prompt, force_regen), load_provider().generate_image, prompt, force=force_regen)
+    panels = st.session_state.board_panels
+    failed = [p for p in panels or [] if p.image is None]
+    if failed and st.button(f"Relancer les {len(failed)} case(s) en échec"):
+        from board import generate_board
+        start_job("board", ("board-retry", id(panels)), generate_board, load_provider(), choix, None, panels=panels)
+
+    poll_jobs()
+
+    # Panneau performance : spans de la dernière action + export JSONL
+    with st.expander("⏱️ Performance"):
+        runs = st.session_state.run_times
+        if runs:
+            cold = startup_stats()["cold_ms"]
+            st.caption(f"Démarrage à froid : {cold:.0f} ms · dernier rerun : {runs[-1]:.0f} ms · "
+                       f"médiane : {sorted(runs)[len(runs) // 2]:.0f} ms ({len(runs)} runs)")
+        if st.session_state.traces:
+            last = st.session_state.traces[-1]
+            st.caption(f"Dernière action : {last.name}")
+            # Pic tracemalloc de l'étape (TRACE_MEMORY=1), sinon variation de RSS du process
+            mem = "pic Mo" if any("peak_bytes" in r for r in last.records) else "Δ RSS Mo"
+            st.dataframe([
+                {"étape": "  " * r["depth"] + r["stage"], "ms": round(r["seconds"] * 1000, 1),
+                 "Ko": round(r["bytes"] / 1024, 1) if r.get("bytes") else None,
+                 mem: round((r.get("peak_bytes") or r.get("rss_delta_bytes") or 0) / 1024 ** 2, 1)}
+                for r in last.records
+            ], hide_index=True)
+            st.download_button("Exporter (JSONL)", "\n".join(t.to_jsonl() for t in st.session_state.traces),
+                               file_name="traces.jsonl", mime="application/x-ndjson")
+        if st.session_state.logs:
+            st.code("\n".join(st.session_state.logs[-30:]), language=None)
 
 st.title("🏛️ Politique en BD")
 st.caption(f"Style : Satire Mordante | Angle : {ANGLE_SATIRIQUE}")
 
-tab1, tab2, tab3 = st.tabs(["📄 Données", "💬 Prompt", "🎨 Résultat"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["📄 Données", "💬 Prompt", "🎨 Résultat", "🔎 Corpus", "🗺️ Comparaison"])
 
 with tab1:
     if st.session_state.analysis_results:
@@ -121,6 +248,70 @@ with tab1:
                 
 with tab2:
     if st.session_state.generated_prompt: st.text_area("Prompt", st.session_state.generated_prompt, height=400)
+    pack = st.session_state.prompt_pack
+    if pack:
+        st.caption(f"{len(st.session_state.generated_prompt)} caractères — {pack.summary()}")
+        if pack.dropped:
+            with st.expander(f"Extraits écartés ({len(pack.dropped)})"):
+                for t, q in pack.dropped: st.write(f"• [{t}] {q}")
 
 with tab3:
-    if st.session_state.generated_image: st.image(st.session_state.generated_image, width=650)
\ No newline at end of file
+    if st.session_state.generated_image: st.image(st.session_state.generated_image, width=650)
+    for p in st.session_state.board_panels or []:
+        if p.image is None: st.warning(f"Case {p.index} ({p.theme}) en échec : {p.error}")
+
+with tab4:
+    store = load_store()
+    q = st.text_input("Mots-clés", placeholder="ex : retraite pouvoir d'achat")
+    c1, c2, c3 = st.columns(3)
+    codes = {v: k for k, v in PARTIS_NOMS.items()}
+    party_f = c1.selectbox("Parti ", ["Tous"] + store.parties(), format_func=lambda c: codes.get(c, c))
+    theme_f = c2.selectbox("Thème", ["Tous"] + store.themes())
+    history = c3.checkbox("Inclure les anciens snapshots", value=False)
+    hits = store.search(q, party=None if party_f == "Tous" else party_f,
+                        theme=None if theme_f == "Tous" else theme_f, latest_only=not history)
+    st.caption(f"{len(hits)} phrase(s)")
+    for h in hits:
+        st.write(f"• **{codes.get(h['party'], h['party'])}** [{', '.join(h['themes'])}] {h['text']}")
+
+with tab5:
+    # Tous les partis en une passe vectorisée (matrice documents x mots-clés)
+    if st.button("Comparer tous les partis"):
+        from theme_matrix import build_theme_matrix, fetch_party_documents
+        with st.spinner("Téléchargement et analyse..."), trace("compare", log_callback=ui_log) as t:
+            docs = fetch_party_documents(PARTY_URLS)
+            st.session_state.theme_matrix = build_theme_matrix(docs) if docs else None
+            if not docs: st.error("Erreur de scraping.")
+        keep_trace(t)
+    m = st.session_state.theme_matrix
+    if m is not None:
+        import altair as alt
+        import pandas as pd
+        codes = {v: k for k, v in PARTIS_NOMS.items()}
+        mode = st.radio("Mesure", ["Parts des thèmes", "TF-IDF", "Écart avec un parti"], horizontal=True)
+        labels, values = m.by_label(m.theme_counts if mode != "TF-IDF" else m.tfidf())
+        if mode == "Parts des thèmes":
+            values = m.shares(values)
+        elif mode == "Écart avec un parti":
+            labels, d = m.deltas()
+            ref = st.selectbox("Référence", labels, format_func=lambda c: codes.get(c, c))
+            values = d[:, labels.index(ref), :]
+        df = pd.DataFrame(values, index=[codes.get(l, l) for l in labels], columns=m.themes)
+        long = df.reset_index(names="parti").melt("parti", var_name="thème", value_name="valeur")
+        scale = alt.Scale(scheme="redblue", domainMid=0) if mode == "Écart avec un parti" else alt.Scale(scheme="blues")
+        st.altair_chart(alt.Chart(long).mark_rect().encode(
+            x=alt.X("thème:N", sort=m.themes), y="parti:N",
+            color=alt.Color("valeur:Q", scale=scale),
+            tooltip=["parti", "thème", alt.Tooltip("valeur:Q", format=".3f")],
+        ), use_container_width=True)
+        st.dataframe(df.style.format("{:.3f}"))
+
+# Durée du script (imports compris) : le premier run du process mesure le démarrage à froid
+_run_ms = (time.perf_counter() - _run_started) * 1000
+if startup_stats()["cold_ms"] is None: startup_stats()["cold_ms"] = _run_ms
+st.session_state.run_times = (st.session_state.run_times + [_run_ms])[-50:]
+
+# Tâche en cours : on relance le script pour suivre sa progression (un clic l'interrompt)
+if st.session_state.jobs:
+    time.sleep(POLL_INTERVAL)
+    st.rerun()
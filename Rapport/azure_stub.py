@@ -0,0 +1,213 @@
+"""
+Serveur local qui imite l'endpoint images.generate d'Azure OpenAI, pour les
+tests de charge et de latence sans appeler (ni payer) Azure.
+
+    python azure_stub.py --port 8089 --latency lognormal:0.5:0.4 --rate-429 0.1
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8089 AZURE_OPENAI_API_KEY=stub streamlit run app.py
+
+Réponses : {"data": [{"url": ...}]} (image servie par le serveur lui-même) ou
+{"data": [{"b64_json": ...}]}, erreurs 429 (avec Retry-After) et 500, et
+refus du filtre de contenu (400 content_filter), selon des taux configurables.
+"""
+import argparse
+import base64
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_GENERATE = re.compile(r"^/openai/deployments/([^/]+)/images/generations$")
+_IMAGE = re.compile(r"^/images/([0-9a-f]+)\.png$")
+
+
+def parse_latency(spec):
+    """
+    Distribution de latence (secondes) : "0", "const:2", "uniform:1:5",
+    "normal:3:1", "lognormal:MU:SIGMA" (paramètres du log). Renvoie rng -> float.
+    """
+    name, *args = spec.split(":")
+    try:
+        if not args:
+            value = float(name)
+            return lambda rng: value
+        args = [float(a) for a in args]
+    except ValueError:
+        raise ValueError(f"Latence invalide : {spec}")
+    if name == "const":
+        return lambda rng: args[0]
+    if name == "uniform":
+        return lambda rng: rng.uniform(args[0], args[1])
+    if name == "normal":
+        return lambda rng: max(0.0, rng.gauss(args[0], args[1]))
+    if name == "lognormal":
+        return lambda rng: rng.lognormvariate(args[0], args[1])
+    raise ValueError(f"Latence invalide : {spec}")
+
+
+def placeholder_png():
+    from image_provider import DummyProvider
+    return DummyProvider.placeholder()
+
+
+class StubConfig:
+    def __init__(self, latency="0", download_latency="0", rate_429=0.0, rate_500=0.0,
+                 content_filter_rate=0.0, response_format="url", retry_after=1, seed=None):
+        self.latency = parse_latency(latency)
+        self.download_latency = parse_latency(download_latency)
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.content_filter_rate = content_filter_rate
+        self.response_format = response_format   # "url", "b64_json", "mixed" ou "request" (celui demandé)
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "ok": 0, "429": 0, "500": 0, "content_filter": 0, "downloads": 0}
+
+    def draw(self):
+        """Tirage (issue, latence) sous verrou : reproductible avec une graine."""
+        with self.lock:
+            self.counts["requests"] += 1
+            latency = self.latency(self.rng)
+            r = self.rng.random()
+            for outcome, rate in (("429", self.rate_429), ("500", self.rate_500), ("content_filter", self.content_filter_rate)):
+                if r < rate:
+                    self.counts[outcome] += 1
+                    return outcome, latency
+                r -= rate
+            self.counts["ok"] += 1
+            fmt = self.response_format
+            if fmt == "mixed":
+                fmt = self.rng.choice(["url", "b64_json"])
+            return fmt, latency
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "AzureImagesStub/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        m = _GENERATE.match(self.path.split("?", 1)[0])
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            request = {}
+        if not m:
+            return self._json(404, {"error": {"code": "404", "message": "Resource not found"}})
+        cfg = self.server.config
+        outcome, latency = cfg.draw()
+        time.sleep(latency)
+        if outcome == "429":
+            return self._json(429, {"error": {"code": "429", "message": "Rate limit is exceeded. Try again later."}},
+                              {"Retry-After": str(cfg.retry_after)})
+        if outcome == "500":
+            return self._json(500, {"error": {"code": "InternalServerError", "message": "The server had an error."}})
+        if outcome == "content_filter":
+            return self._json(400, {"error": {
+                "code": "content_policy_violation",
+                "message": "Your request was rejected as a result of our safety system.",
+                "inner_error": {"code": "ResponsibleAIPolicyViolation",
+                                "content_filter_results": {"violence": {"filtered": True, "severity": "medium"}}},
+            }})
+        if cfg.response_format == "request" and request.get("response_format") in ("url", "b64_json"):
+            outcome = request["response_format"]
+        elif cfg.response_format == "request":
+            outcome = "url"
+        item = {"revised_prompt": request.get("prompt", "")}
+        if outcome == "b64_json":
+            item["b64_json"] = self.server.png_b64
+        else:
+            image_id = uuid.uuid4().hex
+            host = self.headers.get("Host") or f"127.0.0.1:{self.server.server_port}"
+            item["url"] = f"http://{host}/images/{image_id}.png"
+        self._json(200, {"created": int(time.time()), "data": [item]})
+
+    def do_GET(self):
+        if not _IMAGE.match(self.path.split("?", 1)[0]):
+            return self._json(404, {"error": {"code": "404", "message": "Resource not found"}})
+        cfg = self.server.config
+        with cfg.lock:
+            cfg.counts["downloads"] += 1
+            latency = cfg.download_latency(cfg.rng)
+        time.sleep(latency)
+        body = self.server.png
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, StubHandler)
+        self.config = config
+        self.png = placeholder_png()
+        self.png_b64 = base64.b64encode(self.png).decode("ascii")
+
+    @property
+    def endpoint(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_stub(config=None, host="127.0.0.1", port=0):
+    """Démarre le serveur dans un thread (port 0 = port libre) et le renvoie."""
+    server = StubServer((host, port), config or StubConfig())
+    threading.Thread(target=server.serve_forever, daemon=True, name="azure-stub").start()
+    return server
+
+
+def add_stub_arguments(parser):
+    parser.add_argument("--latency", default="0", help='Latence de génération : "2", "uniform:1:5", "lognormal:0.5:0.4"...')
+    parser.add_argument("--download-latency", default="0", help="Latence du téléchargement d'image (même format).")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Part des requêtes en 429.")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="Part des requêtes en 500.")
+    parser.add_argument("--content-filter-rate", type=float, default=0.0, help="Part des requêtes refusées (filtre de contenu).")
+    parser.add_argument("--format", default="url", choices=["url", "b64_json", "mixed", "request"], help="Format des réponses.")
+    parser.add_argument("--retry-after", type=int, default=1, help="Valeur de Retry-After des 429 (secondes).")
+    parser.add_argument("--seed", type=int, default=None, help="Graine des tirages (latences, erreurs).")
+
+
+def config_from_args(args):
+    return StubConfig(args.latency, args.download_latency, args.rate_429, args.rate_500,
+                      args.content_filter_rate, args.format, args.retry_after, args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serveur local imitant Azure OpenAI images.generate.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+    server = StubServer((args.host, args.port), config_from_args(args))
+    print(f"Stub Azure images sur {server.endpoint} (AZURE_OPENAI_ENDPOINT={server.endpoint})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.config.counts))
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Mode batch (sans interface) : scrape -> analyse -> prompt (-> image) pour
+chaque parti, en parallèle sur plusieurs process.
+
+Exemples :
+    python batch.py --out resultats.jsonl
+    python batch.py --party rn lfi --images --variants 2 --image-dir images/
+    python batch.py --urls urls.txt --out resultats.jsonl --workers 8
+    python batch.py --store          # archive aussi les textes dans le corpus
+    python batch.py --from-corpus    # prompts depuis le corpus, sans scraper
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from config import PARTY_URLS, PARTIS_NOMS, ANGLE_SATIRIQUE
+
+
+def run_job(job):
+    """Traite un parti (ou une URL) ; appelée dans un process du pool."""
+    from prompt_engine import build_bd_prompt
+    from scraper import analyse_text, get_corpus, get_text, store_snapshot
+
+    record = {"party": job["name"], "code": job["code"], "urls": job["urls"], "timings": {}}
+    timings = record["timings"]
+    try:
+        if job["from_corpus"]:
+            from corpus_store import get_store
+            t0 = time.perf_counter()
+            results = get_store().analysis_for_party(job["code"])
+            timings["corpus"] = time.perf_counter() - t0
+            if not results:
+                record["error"] = "Parti absent du corpus."
+                return record
+        else:
+            t0 = time.perf_counter()
+            if len(job["urls"]) == 1 and not job["depth"]:
+                text = get_text(job["urls"][0])
+            else:
+                text = get_corpus(job["urls"], max_depth=job["depth"])
+            timings["fetch"] = time.perf_counter() - t0
+            if not text:
+                record["error"] = "Erreur de scraping."
+                return record
+            t0 = time.perf_counter()
+            computed = {}
+            results = analyse_text(text, computed=computed)
+            timings["analyse"] = time.perf_counter() - t0
+            if job["store"]:
+                t0 = time.perf_counter()
+                store_snapshot(job["code"], job["urls"], text, **computed)
+                timings["store"] = time.perf_counter() - t0
+        if not results:
+            # Ni prompt ni images : le message d'erreur ne doit pas partir au provider
+            record["error"] = "Aucune phrase extraite."
+            return record
+        record["themes"] = [t for t, _, _ in results]
+        record["scores"] = {t: s for t, s, _ in results}
+        record["sentences"] = {t: p for t, _, p in results}
+
+        t0 = time.perf_counter()
+        built = build_bd_prompt(job["name"], results, job["angle"], seed=job["seed"])
+        timings["prompt"] = time.perf_counter() - t0
+        if built.no_quotes:
+            record["error"] = built.prompt
+            return record
+        record["prompt"] = built.prompt
+
+        if job["prompt_variants"]:
+            from prompt_engine import DEFAULT_ENGINE
+            t0 = time.perf_counter()
+            record["prompt_variants"] = list(DEFAULT_ENGINE.generate_variants(
+                {job["name"]: results}, job["angles"], n=job["prompt_variants"], base_seed=job["seed"] or 0,
+            ))
+            timings["prompt_variants"] = time.perf_counter() - t0
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def build_jobs(args):
+    base = {
+        "angle": args.angle, "seed": args.seed, "depth": args.depth,
+        "prompt_variants": args.prompt_variants, "angles": args.angles or [args.angle],
+        "store": args.store, "from_corpus": args.from_corpus,
+    }
+    jobs = []
+    if args.urls:
+        with open(args.urls, encoding="utf-8") as f:
+            for i, line in enumerate(l.strip() for l in f):
+                if line and not line.startswith("#"):
+                    jobs.append(dict(base, name=line, code=f"url{i}", urls=[line]))
+        return jobs
+    codes = args.party or list(PARTY_URLS.keys())
+    names = {code: name for name, code in PARTIS_NOMS.items()}
+    for code in codes:
+        if code not in PARTY_URLS:
+            raise SystemExit(f"Parti inconnu : {code} (choix : {', '.join(PARTY_URLS)})")
+        jobs.append(dict(base, name=names.get(code, code), code=code, urls=PARTY_URLS[code]))
+    return jobs
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Génération batch des analyses et prompts BD.")
+    parser.add_argument("--party", nargs="*", help="Codes des partis (défaut : tous). Ex : rn lfi")
+    parser.add_argument("--urls", help="Fichier texte avec une URL par ligne (remplace --party).")
+    parser.add_argument("--out", default="-", help="Fichier JSONL de sortie (défaut : stdout).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Nombre de process.")
+    parser.add_argument("--depth", type=int, default=0, help="Profondeur de crawl (liens du même site).")
+    parser.add_argument("--angle", default=ANGLE_SATIRIQUE, help="Angle satirique.")
+    parser.add_argument("--seed", type=int, default=None, help="Graine pour la sélection des phrases.")
+    parser.add_argument("--prompt-variants", type=int, default=0, help="Variantes de prompt reproductibles par angle (A/B).")
+    parser.add_argument("--angles", nargs="*", help="Angles satiriques pour les variantes (défaut : --angle).")
+    parser.add_argument("--store", action="store_true", help="Archiver les textes scrapés dans le corpus (SQLite FTS5).")
+    parser.add_argument("--from-corpus", action="store_true", help="Utiliser le dernier snapshot du corpus au lieu de scraper.")
+    parser.add_argument("--images", action="store_true", help="Générer aussi les images.")
+    parser.add_argument("--image-dir", default="images", help="Dossier des images générées.")
+    parser.add_argument("--variants", type=int, default=1, help="Nombre d'images par prompt.")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="Générations d'images simultanées.")
+    parser.add_argument("--rate", type=float, default=30, help="Générations d'images max par minute.")
+    parser.add_argument("--no-image-cache", action="store_true", help="Ignorer le cache d'images (régénérer).")
+    args = parser.parse_args(argv)
+
+    jobs = build_jobs(args)
+    queue = None
+    if args.images:
+        from image_provider import get_provider
+        from image_queue import ImageQueue
+        from image_store import CachedImageProvider
+        os.makedirs(args.image_dir, exist_ok=True)
+        provider = get_provider()
+        if not args.no_image_cache:
+            provider = CachedImageProvider(provider)
+        queue = ImageQueue(provider, max_in_flight=args.max_in_flight, rate_per_minute=args.rate)
+
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    t0 = time.perf_counter()
+    errors = 0
+    pending = []
+
+    def write(record):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.workers or 1, len(jobs) or 1))) as pool:
+            futures = [pool.submit(run_job, job) for job in jobs]
+            for fut in as_completed(futures):
+                record = fut.result()
+                if queue is not None and "prompt" in record:
+                    # Les images partent dans la file partagée (concurrence + rate limit communs)
+                    log = lambda msg, level, code=record["code"]: print(f"[{code}] {msg}", file=sys.stderr)
+                    pending.append((record, time.perf_counter(), queue.submit(record["prompt"], args.variants, log)))
+                    continue
+                errors += "error" in record
+                write(record)
+        for record, started, image_futures in pending:
+            record["images"] = []
+            for i, f in enumerate(image_futures):
+                try:
+                    image = f.result()
+                    path = os.path.join(args.image_dir, f"{record['code']}_{i + 1}.png")
+                    with open(path, "wb") as fh:
+                        fh.write(image)
+                    record["images"].append(path)
+                except Exception as e:
+                    record["error"] = str(e)
+            record["timings"]["image"] = time.perf_counter() - started
+            errors += "error" in record
+            write(record)
+    finally:
+        if queue is not None:
+            queue.shutdown()
+        if out is not sys.stdout:
+            out.close()
+    print(f"{len(jobs)} parti(s) traité(s), {errors} erreur(s), {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Benchmark du pipeline sur un corpus synthétique de programmes politiques.
+
+Chaque étape est mesurée séparément (temps, pic mémoire, débit) :
+get_text (parsing HTML), clean_tokens, scoring des thèmes,
+get_sentences_for_theme (et l'index de phrases), generate_bd_prompt_logic.
+
+Exemples :
+    python benchmark.py --sizes 10KB 1MB 10MB
+    python benchmark.py --sizes 1MB --save-baseline baseline.json
+    python benchmark.py --sizes 1MB --baseline baseline.json --tolerance 0.2
+    python benchmark.py --startup     # démarrage à froid et reruns de app.py
+"""
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from scraper import (
+    SENTENCE_INDEXER, THEMES_DEFINITIONS, clean_tokens, generate_bd_prompt_logic,
+    html_to_text, score_themes,
+)
+from sentence_index import SENTENCE_BOUNDARY
+
+
+def get_sentences_for_theme(txt, keywords, max_ex=8):
+    """
+    Ancien parcours par thème (une regex et un découpage du texte par thème),
+    gardé comme référence de mesure face à l'index de phrases.
+    """
+    sentences = re.split(r'(?<=[\.\?\!])\s+', txt)
+    examples = []
+    pattern = r"\b(" + "|".join([re.escape(k) for k in keywords]) + r")\b"
+    for s in sentences:
+        if re.search(pattern, s.lower()):
+            s = s.strip()
+            if 30 < len(s) < 300 and s not in examples:
+                examples.append(s)
+            if len(examples) >= max_ex: break
+    return examples
+
+
+FILLER = (
+    "nous voulons pour le pays une politique ambitieuse afin de garantir à chaque citoyen "
+    "un avenir meilleur dans nos territoires avec des mesures concrètes et justes qui "
+    "permettront de construire ensemble demain en protégeant les plus fragiles face aux crises"
+).split()
+
+BOILERPLATE = [
+    "<nav><ul><li><a href='/'>Accueil</a></li><li><a href='/actus'>Actualités</a></li><li><a href='/don'>Faire un don</a></li></ul></nav>",
+    "<div class='cookie'>Ce site utilise des cookies pour améliorer votre expérience. Accepter Refuser Paramétrer.</div>",
+    "<script>window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments);}gtag('js',new Date());</script>",
+    "<style>.menu{display:flex}.btn{color:#fff;background:#003}</style>",
+    "<footer>Mentions légales - Politique de confidentialité - Contact - Presse - Recrutement</footer>",
+]
+
+UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+def parse_size(s):
+    s = s.strip().upper()
+    for unit, mult in UNITS.items():
+        if s.endswith(unit):
+            return int(float(s[:-len(unit)]) * mult)
+    return int(s)
+
+
+def generate_programme_html(size_bytes, keyword_density=0.08, boilerplate_ratio=0.2, seed=0):
+    """
+    Page HTML synthétique de programme politique en français.
+
+    keyword_density : proportion de mots tirés du lexique THEMES_DEFINITIONS
+    boilerplate_ratio : part (en octets) de menus/cookies/scripts/footers
+    """
+    rng = random.Random(seed)
+    keywords = [k for kws in THEMES_DEFINITIONS.values() for k in kws]
+    parts = ["<!DOCTYPE html><html><head><meta charset='utf-8'><title>Notre programme</title></head><body>"]
+    size = len(parts[0])
+    content = boiler = 0
+    while size < size_bytes:
+        if boilerplate_ratio and boiler < boilerplate_ratio * (content + boiler + 1):
+            chunk = rng.choice(BOILERPLATE)
+            boiler += len(chunk)
+        else:
+            sentences = []
+            for _ in range(rng.randint(2, 6)):
+                words = [
+                    rng.choice(keywords) if rng.random() < keyword_density else rng.choice(FILLER)
+                    for _ in range(rng.randint(8, 35))
+                ]
+                sentences.append(" ".join(words).capitalize() + rng.choice([".", ".", ".", " !", " ?"]))
+            tag = rng.choice(["p", "p", "p", "li", "h2"])
+            chunk = f"<{tag}>{' '.join(sentences)}</{tag}>\n"
+            content += len(chunk)
+        parts.append(chunk)
+        size += len(chunk.encode("utf-8"))
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+# Nombre de répétitions chronométrées par étape (on garde le meilleur temps)
+REPEAT = 3
+# Étapes plus rapides que ça : trop bruitées pour parler de régression
+MIN_COMPARE_SECONDS = 0.005
+
+
+def measure(fn, *args, repeat=REPEAT):
+    """
+    (résultat, secondes, pic mémoire en octets) d'un appel.
+    Le pic mémoire est mesuré à part : tracemalloc fausserait le chronométrage.
+    """
+    elapsed = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        elapsed = min(elapsed, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_stages(html, repeat=REPEAT):
+    mb = len(html.encode("utf-8")) / 1024 ** 2
+    stages = {}
+
+    text, t, peak = measure(html_to_text, html, repeat=repeat)
+    stages["get_text"] = {"seconds": t, "peak_bytes": peak, "mb_per_s": mb / t if t else None}
+    text_mb = len(text.encode("utf-8")) / 1024 ** 2
+    n_sentences = len(SENTENCE_BOUNDARY.findall(text)) + 1
+
+    tokens, t, peak = measure(clean_tokens, text, repeat=repeat)
+    stages["clean_tokens"] = {"seconds": t, "peak_bytes": peak, "mb_per_s": text_mb / t if t else None}
+
+    (scores, _), t, peak = measure(score_themes, tokens, repeat=repeat)
+    stages["score_themes"] = {"seconds": t, "peak_bytes": peak, "tokens_per_s": len(tokens) / t if t else None}
+
+    def all_themes():
+        return [(th, scores[th], get_sentences_for_theme(text, kws)) for th, kws in THEMES_DEFINITIONS.items() if scores[th]]
+    results, t, peak = measure(all_themes, repeat=repeat)
+    stages["get_sentences_for_theme"] = {"seconds": t, "peak_bytes": peak, "sentences_per_s": n_sentences / t if t else None}
+
+    # Chemin réellement utilisé par scrape_political_site (index en une passe)
+    def indexed_themes():
+        index = SENTENCE_INDEXER.index(text)
+        return [index.examples(th) for th in THEMES_DEFINITIONS if scores[th]]
+    _, t, peak = measure(indexed_themes, repeat=repeat)
+    stages["sentence_index"] = {"seconds": t, "peak_bytes": peak, "sentences_per_s": n_sentences / t if t else None}
+
+    _, t, peak = measure(generate_bd_prompt_logic, "Parti Test", results, "Économie vs Réalité", 60, 0, repeat=repeat)
+    stages["generate_bd_prompt_logic"] = {"seconds": t, "peak_bytes": peak}
+
+    return {"html_mb": mb, "text_mb": text_mb, "tokens": len(tokens), "sentences": n_sentences, "stages": stages}
+
+
+def compare(current, baseline, tolerance):
+    """Liste des régressions (temps) au-delà de la tolérance relative."""
+    regressions = []
+    for size, run in current.items():
+        base = baseline.get(size)
+        if not base:
+            continue
+        for stage, m in run["stages"].items():
+            b = base["stages"].get(stage)
+            if b and b["seconds"] >= MIN_COMPARE_SECONDS and m["seconds"] > b["seconds"] * (1 + tolerance):
+                regressions.append(f"{size} {stage}: {b['seconds']:.4f}s -> {m['seconds']:.4f}s (+{m['seconds'] / b['seconds'] - 1:.0%})")
+    return regressions
+
+
+def print_report(report):
+    for size, run in report.items():
+        print(f"\n=== {size} : HTML {run['html_mb']:.2f} Mo, texte {run['text_mb']:.2f} Mo, "
+              f"{run['tokens']} tokens, {run['sentences']} phrases")
+        for stage, m in run["stages"].items():
+            extra = ""
+            if m.get("mb_per_s"): extra = f"{m['mb_per_s']:.2f} Mo/s"
+            elif m.get("sentences_per_s"): extra = f"{m['sentences_per_s']:.0f} phrases/s"
+            elif m.get("tokens_per_s"): extra = f"{m['tokens_per_s']:.0f} tokens/s"
+            print(f"  {stage:<26} {m['seconds'] * 1000:9.1f} ms  pic {m['peak_bytes'] / 1024 ** 2:8.2f} Mo  {extra}")
+
+
+# Exécuté dans un process neuf : aucun module du projet n'est encore importé
+STARTUP_SCRIPT = """
+import json, statistics, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+t = time.perf_counter(); at.run(); cold = time.perf_counter() - t
+reruns = []
+for _ in range(int(sys.argv[2])):
+    t = time.perf_counter(); at.run(); reruns.append(time.perf_counter() - t)
+print(json.dumps({"cold_s": cold, "rerun_s": statistics.median(reruns), "rerun_max_s": max(reruns),
+                  "modules": sorted(m for m in ("bs4", "requests", "lxml", "numpy", "PIL", "openai") if m in sys.modules)}))
+"""
+
+
+def measure_startup(repeat=REPEAT):
+    """Premier run de app.py (imports compris) puis reruns, via streamlit.testing dans un process neuf."""
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    out = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, app, str(max(1, repeat))],
+                         capture_output=True, text=True, check=True, cwd=os.path.dirname(app))
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline scraper/analyse/prompt.")
+    parser.add_argument("--sizes", nargs="+", default=["10KB", "1MB"], help="Tailles du HTML (10KB à 50MB).")
+    parser.add_argument("--density", type=float, default=0.08, help="Densité de mots-clés (0-1).")
+    parser.add_argument("--boilerplate", type=float, default=0.2, help="Part de boilerplate (0-1).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="Répétitions par étape (meilleur temps).")
+    parser.add_argument("--json", help="Écrire le rapport complet en JSON.")
+    parser.add_argument("--save-baseline", help="Enregistrer ce run comme référence.")
+    parser.add_argument("--baseline", help="Comparer à une référence enregistrée.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Régression tolérée (0.25 = +25%%).")
+    parser.add_argument("--startup", action="store_true", help="Mesurer le démarrage à froid et les reruns de app.py.")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        s = measure_startup(args.repeat)
+        print(f"app.py : premier run {s['cold_s'] * 1000:.0f} ms, rerun {s['rerun_s'] * 1000:.0f} ms "
+              f"(max {s['rerun_max_s'] * 1000:.0f} ms), modules lourds chargés : {', '.join(s['modules']) or 'aucun'}")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(s, f, indent=2)
+        return 0
+
+    report = {}
+    for size in args.sizes:
+        html = generate_programme_html(parse_size(size), args.density, args.boilerplate, args.seed)
+        report[size] = run_stages(html, args.repeat)
+    print_report(report)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRÉGRESSIONS :")
+            for r in regressions:
+                print("  " + r)
+            return 1
+        print("\nAucune régression par rapport à la référence.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import heapq
+import math
+from collections import Counter
+
+# Paramètres BM25 classiques
+K1 = 1.2
+B = 0.75
+
+
+class TermStats:
+    """
+    Statistiques de collection pour BM25, accumulées pendant la passe de
+    segmentation : nombre de phrases, longueur totale (en mots) et nombre de
+    phrases contenant chaque mot-clé (df).
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.total_len = 0
+        self.df = Counter()
+
+    def add_sentence(self, length, terms):
+        self.n += 1
+        self.total_len += length
+        self.df.update(terms.keys())
+
+    def update(self, other):
+        """Fusionne les statistiques d'un autre bloc (mode streaming)."""
+        self.n += other.n
+        self.total_len += other.total_len
+        self.df.update(other.df)
+
+    def idf(self, term):
+        df = self.df.get(term, 0)
+        return math.log(1 + (self.n - df + 0.5) / (df + 0.5))
+
+    def score(self, terms, length, query):
+        """Score BM25 d'une phrase ({mot-clé: tf}, longueur) pour un ensemble de mots-clés."""
+        avgdl = self.total_len / self.n if self.n else 1
+        norm = K1 * (1 - B + B * length / (avgdl or 1))
+        return sum(
+            self.idf(t) * tf * (K1 + 1) / (tf + norm)
+            for t, tf in terms.items() if t in query
+        )
+
+
+class TopK:
+    """
+    Tas de taille fixe : garde les k meilleurs éléments vus, en O(log k) par
+    ajout. À score égal, le premier arrivé est gardé ; un élément déjà
+    présent dans le tas n'est pas ajouté deux fois.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []
+        self._members = set()
+        self._seq = 0
+
+    def push(self, score, item):
+        if item in self._members:
+            return
+        entry = (score, -self._seq, item)
+        self._seq += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            self._members.discard(heapq.heapreplace(self._heap, entry)[2])
+        else:
+            return
+        self._members.add(item)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def items(self):
+        """Éléments du meilleur au moins bon."""
+        return [item for _, _, item in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
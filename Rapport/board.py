@@ -0,0 +1,269 @@
+"""
+Planche BD case par case : une image par case (générées en parallèle via
+n'importe quel ImageProvider), puis assemblage Pillow avec gouttières et
+bulles de dialogue. Seules les cases en échec sont régénérées.
+"""
+import io
+import math
+import os
+
+from image_provider import is_content_filter
+from image_queue import ImageQueue
+from instrumentation import span
+from jobs import JobCancelled
+
+# Planche finale (pixels) et espacements
+BOARD_WIDTH = int(os.getenv("BOARD_WIDTH", 1024))
+GUTTER = int(os.getenv("BOARD_GUTTER", 16))
+BUBBLE_MAX_CHARS = 90
+# Police des bulles (TrueType) ; à défaut, police Pillow par défaut
+BOARD_FONT = os.getenv("BOARD_FONT", "DejaVuSans-Bold.ttf")
+
+PANEL_TEMPLATE = """Une seule case de bande dessinée satirique franco-belge, style presse satirique.
+Dessin cartoon net, contours noirs épais, personnages caricaturaux (gros nez, expressions exagérées),
+couleurs vives et contrastées. Pas réaliste, pas photo. AUCUN texte, AUCUNE bulle dans l'image
+(les dialogues sont ajoutés ensuite).
+
+Parti / courant caricaturé : {party}
+{angle}Case {index}/{total} — {scene}
+Thème : {theme}
+Idée à illustrer (sans la recopier) : « {quote} »
+Règles : satire des idées et du discours, pas de haine, pas d'insultes, pas de personnes privées.
+"""
+
+# Version prudente utilisée pour réessayer une case refusée (filtre de contenu)
+SAFE_PANEL_TEMPLATE = """Une seule case de bande dessinée humoristique franco-belge, dessin cartoon
+coloré, contours noirs épais, ton léger et bienveillant. AUCUN texte, AUCUNE bulle dans l'image.
+Case {index}/{total} — {scene}
+Thème général : {theme}
+"""
+
+SCENES = [
+    "meeting politique avec drapeaux, foule enthousiaste et slogans",
+    "coulisses dans un bureau feutré où le discours change",
+    "citoyens au supermarché devant les prix",
+    "plateau de télévision, promesses face caméra",
+    "citoyens au travail qui subissent la réalité",
+    "conférence de presse avec graphiques absurdes",
+    "réunion de campagne autour d'un tableau blanc",
+    "file d'attente au guichet d'une administration",
+    "tournée de terrain, poignées de main et selfies",
+]
+FINAL_SCENE = "chute satirique très claire : panneau absurde, retournement, punchline"
+
+
+class Panel:
+    def __init__(self, index, total, theme, quote, scene, prompt, safe_prompt, bubble):
+        self.index = index          # 1..total
+        self.total = total
+        self.theme = theme
+        self.quote = quote
+        self.scene = scene
+        self.prompt = prompt
+        self.safe_prompt = safe_prompt
+        self.bubble = bubble        # texte de la bulle (MAJUSCULES, court)
+        self.image = None           # bytes PNG une fois générée
+        self.error = None
+        self.filtered = False       # dernier échec dû au filtre de contenu
+        self.attempts = 0
+
+
+def bubble_text(quote, max_chars=BUBBLE_MAX_CHARS):
+    """Extrait court en MAJUSCULES, coupé sur un mot."""
+    text = " ".join(quote.split()).upper()
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0].rstrip(",;:") + "…"
+
+
+def split_panels(party_name, selected, n_panels=6, angle_satirique=""):
+    """
+    Répartit les extraits retenus par le prompt builder [(thème, extrait)]
+    en n_panels cases (1 à 10) : un extrait par case, thèmes alternés, la
+    dernière case porte la chute.
+    """
+    if not selected:
+        return []
+    n = max(1, min(10, n_panels, len(selected)))
+    # Alternance des thèmes : le i-ème extrait de chaque thème, tour à tour
+    by_theme = {}
+    for theme, quote in selected:
+        by_theme.setdefault(theme, []).append(quote)
+    order = []
+    depth = 0
+    while len(order) < n:
+        row = [(t, qs[depth]) for t, qs in by_theme.items() if depth < len(qs)]
+        if not row:
+            break
+        order.extend(row)
+        depth += 1
+    angle = f"Angle satirique : {angle_satirique}\n" if angle_satirique else ""
+    panels = []
+    for i, (theme, quote) in enumerate(order[:n], start=1):
+        scene = FINAL_SCENE if i == n and n > 1 else SCENES[(i - 1) % len(SCENES)]
+        fields = {"party": party_name, "angle": angle, "index": i, "total": n,
+                  "scene": scene, "theme": theme, "quote": quote}
+        panels.append(Panel(i, n, theme, quote, scene, PANEL_TEMPLATE.format(**fields),
+                            SAFE_PANEL_TEMPLATE.format(**fields), bubble_text(quote)))
+    return panels
+
+
+def _font(size):
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype(BOARD_FONT, size)
+    except OSError:
+        try:
+            return ImageFont.load_default(size=size)   # Pillow >= 10.1
+        except TypeError:
+            return ImageFont.load_default()
+
+
+def _wrap(draw, text, font, max_width):
+    """Découpe gloutonne en lignes d'au plus max_width pixels (mesurés avec la police)."""
+    lines = []
+    line = ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if line and draw.textlength(candidate, font=font) > max_width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _draw_bubble(draw, text, box, font):
+    """Bulle arrondie avec pointe, en haut de la case `box` (x0, y0, x1, y1)."""
+    x0, y0, x1, y1 = box
+    pad = max(6, (x1 - x0) // 40)
+    lines = _wrap(draw, text, font, x1 - x0 - 4 * pad)[:4]
+    if not lines:
+        return
+    ascent, descent = font.getmetrics()
+    line_h = ascent + descent + 2
+    w = max(draw.textlength(l, font=font) for l in lines) + 2 * pad
+    h = line_h * len(lines) + 2 * pad
+    bx0, by0 = x0 + pad, y0 + pad
+    bx1, by1 = min(x1 - pad, bx0 + w), by0 + h
+    tail_x = bx0 + (bx1 - bx0) // 3
+    draw.polygon([(tail_x, by1 - 1), (tail_x + pad * 2, by1 - 1), (tail_x - pad, by1 + pad * 2)],
+                 fill="white", outline="black")
+    draw.rounded_rectangle((bx0, by0, bx1, by1), radius=pad * 2, fill="white", outline="black", width=2)
+    for k, line in enumerate(lines):
+        draw.text((bx0 + pad, by0 + pad + k * line_h), line, fill="black", font=font)
+
+
+def compose_board(panels, width=BOARD_WIDTH, gutter=GUTTER, cols=None):
+    """
+    Assemble les cases en une planche PNG. La planche est allouée une seule
+    fois ; chaque case y est collée puis sa bulle dessinée directement dessus.
+    Une case sans image est remplacée par un cadre gris.
+    """
+    from PIL import Image, ImageDraw
+    n = len(panels)
+    cols = cols or (1 if n == 1 else 2 if n <= 4 else 3)
+    rows = math.ceil(n / cols)
+    size = (width - gutter * (cols + 1)) // cols
+    height = rows * size + gutter * (rows + 1)
+    board = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(board)
+    font = _font(max(10, size // 18))
+    for k, panel in enumerate(panels):
+        x = gutter + (k % cols) * (size + gutter)
+        y = gutter + (k // cols) * (size + gutter)
+        box = (x, y, x + size, y + size)
+        if panel.image is not None:
+            with Image.open(io.BytesIO(panel.image)) as img:
+                img.draft("RGB", (size, size))   # décodage réduit quand le format le permet
+                board.paste(img.convert("RGB").resize((size, size), Image.LANCZOS), (x, y))
+        else:
+            draw.rectangle(box, fill=(200, 200, 200))
+        draw.rectangle(box, outline="black", width=3)
+        _draw_bubble(draw, panel.bubble, box, font)
+    out = io.BytesIO()
+    board.save(out, format="PNG")
+    return out.getvalue()
+
+
+class BoardPipeline:
+    """
+    Génère les cases en parallèle à travers une ImageQueue (concurrence,
+    rate limit, retries sur erreurs transitoires), puis assemble la planche.
+    Après chaque tour, seules les cases en échec sont relancées ; une case
+    refusée par le filtre de contenu est relancée avec le prompt prudent.
+    L'annulation de la tâche (JobCancelled) arrête toute la planche.
+    """
+
+    def __init__(self, provider, queue=None, max_in_flight=4, rate_per_minute=30, panel_retries=2):
+        self.queue = queue or ImageQueue(provider, max_in_flight=max_in_flight, rate_per_minute=rate_per_minute)
+        self._own_queue = queue is None
+        self.panel_retries = panel_retries
+
+    def generate_panels(self, panels, log_callback=None):
+        pending = list(panels)
+        for round_ in range(self.panel_retries + 1):
+            if not pending:
+                break
+            if round_ and log_callback:
+                log_callback(f"[Planche] Nouvel essai pour {len(pending)} case(s) en échec.", "warning")
+            futures = [
+                (p, self.queue.submit(p.safe_prompt if p.filtered else p.prompt, 1, log_callback,
+                                      label=f"Case {p.index}/{p.total}")[0])
+                for p in pending
+            ]
+            failed = []
+            for p, fut in futures:
+                p.attempts += 1
+                try:
+                    p.image = fut.result()
+                    p.error = None
+                    p.filtered = False
+                except JobCancelled:
+                    for _, other in futures:
+                        other.cancel()
+                    raise
+                except Exception as e:
+                    p.error = str(e)
+                    p.filtered = is_content_filter(e)
+                    failed.append(p)
+            pending = failed
+        return panels
+
+    def generate_board(self, party_name, selected, n_panels=6, angle_satirique="", log_callback=None, panels=None):
+        """
+        Renvoie (PNG de la planche, cases). `panels` permet de relancer une
+        planche précédente : les cases déjà réussies sont gardées telles quelles.
+        """
+        if panels is None:
+            panels = split_panels(party_name, selected, n_panels, angle_satirique)
+        if not panels:
+            raise ValueError("Aucun extrait pour composer la planche.")
+        todo = [p for p in panels if p.image is None]
+        if log_callback:
+            log_callback(f"[Planche] {len(todo)}/{len(panels)} case(s) à générer.", "info")
+        with span("panels"):
+            self.generate_panels(todo, log_callback)
+        failed = [p for p in panels if p.image is None]
+        if failed and log_callback:
+            log_callback(f"[Planche] {len(failed)} case(s) définitivement en échec : {failed[0].error}", "error")
+        with span("compose"):
+            board = compose_board(panels)
+        if log_callback:
+            log_callback("[Planche] Planche assemblée.", "success")
+        return board, panels
+
+    def shutdown(self):
+        if self._own_queue:
+            self.queue.shutdown()
+
+
+def generate_board(provider, party_name, selected, n_panels=6, angle_satirique="", panels=None, log_callback=None):
+    """Planche complète avec une file dédiée (fermée à la fin) ; renvoie (PNG, cases)."""
+    pipeline = BoardPipeline(provider)
+    try:
+        return pipeline.generate_board(party_name, selected, n_panels, angle_satirique, log_callback, panels)
+    finally:
+        pipeline.shutdown()
@@ -0,0 +1,17 @@
+# --- CONFIG PARTIS (partagée par l'app Streamlit et le mode batch) ---
+PARTY_URLS = {
+    "rn": ["https://rassemblementnational.fr/22-mesures"],
+    "lfi": ["https://programme.lafranceinsoumise.fr/programme-version-courte/"],
+    "ps": ["https://www.parti-socialiste.fr/le_programme"],
+    "lr": ["https://www.touteleurope.eu/vie-politique-des-etats-membres/elections-legislatives-2024-quel-est-le-programme-des-republicains-sur-l-europe/"],
+    "eeln": ["https://www.latribune.fr/economie/union-europeenne/europeennes-le-programme-de-valerie-hayer-renaissance-en-3-minutes-chrono-999162.html"],
+}
+PARTIS_NOMS = {
+    "Rassemblement National": "rn", "La France Insoumise": "lfi",
+    "Parti Socialiste": "ps", "Les Républicains": "lr",
+    "Renaissance": "eeln", 
+}
+ANGLE_SATIRIQUE = "Économie vs Réalité"
+
+# Longueur max d'un prompt image (DALL-E ~4000 caractères, marge de sécurité)
+PROMPT_MAX_CHARS = 3900
@@ -0,0 +1,234 @@
+import os
+import re
+import threading
+import time
+
+from analysis_cache import text_hash
+from http_cache import CACHE_DIR, open_db
+from near_dup import NearDuplicateFilter
+
+CORPUS_DB = os.getenv("CORPUS_DB", os.path.join(CACHE_DIR, "corpus.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    party TEXT NOT NULL,
+    url TEXT NOT NULL,
+    UNIQUE (party, url)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents(id),
+    taken_at REAL NOT NULL,
+    text_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_doc ON snapshots(document_id, taken_at);
+CREATE TABLE IF NOT EXISTS snapshot_scores (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    theme TEXT NOT NULL,
+    score INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sentences (
+    id INTEGER PRIMARY KEY,
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sentences_snapshot ON sentences(snapshot_id);
+CREATE TABLE IF NOT EXISTS sentence_themes (
+    sentence_id INTEGER NOT NULL REFERENCES sentences(id),
+    theme TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sentence_themes_theme ON sentence_themes(theme, sentence_id);
+CREATE INDEX IF NOT EXISTS sentence_themes_sentence ON sentence_themes(sentence_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS sentences_fts USING fts5(
+    text, content='sentences', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text):
+    """Requête utilisateur -> requête FTS5 sûre (tous les mots, préfixes acceptés)."""
+    words = _WORD.findall(text or "")
+    return " ".join(f'"{w}"*' for w in words)
+
+
+class CorpusStore:
+    """
+    Corpus persistant (SQLite + index plein texte FTS5) des pages scrapées.
+
+    documents (parti, URL) -> snapshots (une par scrape au contenu nouveau)
+    -> phrases, avec leurs thèmes et les scores de thèmes du snapshot.
+    Les phrases sont insérées par lots (executemany, une transaction).
+    """
+
+    def __init__(self, path=CORPUS_DB):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = open_db(path)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    # --- Écriture ---
+    def _last_hash(self, party, url):
+        with self._lock:
+            row = self._db.execute(
+                """SELECT sn.text_hash FROM snapshots sn JOIN documents d ON d.id = sn.document_id
+                   WHERE d.party = ? AND d.url = ? ORDER BY sn.taken_at DESC LIMIT 1""", (party, url)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _document_id(self, party, url):
+        self._db.execute("INSERT OR IGNORE INTO documents (party, url) VALUES (?, ?)", (party, url))
+        return self._db.execute("SELECT id FROM documents WHERE party = ? AND url = ?", (party, url)).fetchone()[0]
+
+    def add_snapshot(self, party, url, text, min_len=30, max_len=300, index=None, scores=None):
+        """
+        Enregistre un snapshot : toutes les phrases du texte liées à au moins un
+        thème (sans quasi-doublons), et les scores de thèmes. Renvoie l'id du snapshot, ou None si le
+        texte est identique au dernier snapshot du document (vérifié avant toute analyse).
+        index, scores : SentenceIndex et scores déjà calculés pour ce texte, réutilisés tels quels.
+        """
+        from scraper import SENTENCE_INDEXER, clean_tokens, score_themes
+
+        h = text_hash(text)
+        if self._last_hash(party, url) == h:
+            return None
+        if index is None:
+            index = SENTENCE_INDEXER.index(text)
+        if scores is None:
+            scores, _ = score_themes(clean_tokens(text))
+        themes_of = {}
+        for theme, ids in index.postings.items():
+            for i in ids:
+                themes_of.setdefault(i, []).append(theme)
+
+        with self._lock, self._db:
+            doc_id = self._document_id(party, url)
+            last = self._db.execute(
+                "SELECT text_hash FROM snapshots WHERE document_id = ? ORDER BY taken_at DESC LIMIT 1", (doc_id,)
+            ).fetchone()
+            if last and last[0] == h:
+                return None
+            snap_id = self._db.execute(
+                "INSERT INTO snapshots (document_id, taken_at, text_hash) VALUES (?, ?, ?)", (doc_id, time.time(), h)
+            ).lastrowid
+            self._db.executemany(
+                "INSERT INTO snapshot_scores VALUES (?, ?, ?)",
+                [(snap_id, t, s) for t, s in scores.items() if s > 0],
+            )
+            rows = []
+            dedup = NearDuplicateFilter()
+            for i in sorted(themes_of):
+                s = index.sentence(i)
+                if min_len < len(s) < max_len and dedup.add(s):
+                    rows.append((i, s))
+            first_id = (self._db.execute("SELECT COALESCE(MAX(id), 0) FROM sentences").fetchone()[0]) + 1
+            self._db.executemany(
+                "INSERT INTO sentences (id, snapshot_id, position, text) VALUES (?, ?, ?, ?)",
+                [(first_id + k, snap_id, pos, s) for k, (pos, s) in enumerate(rows)],
+            )
+            self._db.executemany(
+                "INSERT INTO sentence_themes VALUES (?, ?)",
+                [(first_id + k, t) for k, (pos, _) in enumerate(rows) for t in themes_of[pos]],
+            )
+            self._db.execute(
+                "INSERT INTO sentences_fts (rowid, text) SELECT id, text FROM sentences WHERE snapshot_id = ?", (snap_id,)
+            )
+            return snap_id
+
+    # --- Lecture ---
+    def parties(self):
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT DISTINCT party FROM documents ORDER BY party")]
+
+    def themes(self):
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT DISTINCT theme FROM sentence_themes ORDER BY theme")]
+
+    def search(self, query="", party=None, theme=None, since=None, latest_only=True, limit=50):
+        """
+        Phrases correspondant à la requête (mots-clés FTS5, classées par BM25),
+        filtrées par parti, thème et date. Renvoie une liste de dicts.
+        """
+        sql = ["SELECT s.id, s.text, d.party, d.url, sn.taken_at"]
+        params = []
+        q = fts_query(query)
+        if q:
+            sql.append("FROM sentences_fts f JOIN sentences s ON s.id = f.rowid")
+        else:
+            sql.append("FROM sentences s")
+        sql.append("JOIN snapshots sn ON sn.id = s.snapshot_id JOIN documents d ON d.id = sn.document_id WHERE 1 = 1")
+        if q:
+            sql.append("AND sentences_fts MATCH ?")
+            params.append(q)
+        if party:
+            sql.append("AND d.party = ?")
+            params.append(party)
+        if theme:
+            sql.append("AND s.id IN (SELECT sentence_id FROM sentence_themes WHERE theme = ?)")
+            params.append(theme)
+        if since:
+            sql.append("AND sn.taken_at >= ?")
+            params.append(since)
+        if latest_only:
+            sql.append("AND sn.taken_at = (SELECT MAX(taken_at) FROM snapshots WHERE document_id = d.id)")
+        sql.append("ORDER BY bm25(sentences_fts)" if q else "ORDER BY sn.taken_at DESC, s.position")
+        sql.append("LIMIT ?")
+        params.append(limit)
+        with self._lock:
+            rows = self._db.execute(" ".join(sql), params).fetchall()
+            themes = {}
+            if rows:
+                marks = ",".join("?" * len(rows))
+                for sid, t in self._db.execute(
+                    f"SELECT sentence_id, theme FROM sentence_themes WHERE sentence_id IN ({marks})", [r[0] for r in rows]
+                ):
+                    themes.setdefault(sid, []).append(t)
+        return [
+            {"text": text, "party": p, "url": url, "taken_at": ts, "themes": themes.get(sid, [])}
+            for sid, text, p, url, ts in rows
+        ]
+
+    def analysis_for_party(self, party, max_ex=8):
+        """
+        Résultats au format de scrape_political_site [(theme, score, [phrases])]
+        à partir du dernier snapshot du parti, sans re-scraper. Un seul snapshot :
+        un crawl contient déjà la page d'accueil scrapée seule, additionner les
+        documents compterait deux fois les mêmes scores et phrases.
+        """
+        with self._lock:
+            row = self._db.execute(
+                """SELECT sn.id FROM snapshots sn JOIN documents d ON d.id = sn.document_id
+                   WHERE d.party = ? ORDER BY sn.taken_at DESC, sn.id DESC LIMIT 1""",
+                (party,),
+            ).fetchone()
+            if row is None:
+                return None
+            snap = row[0]
+            scores = self._db.execute(
+                "SELECT theme, score FROM snapshot_scores WHERE snapshot_id = ? ORDER BY score DESC", (snap,)
+            ).fetchall()
+            results = []
+            for t, sc in scores:
+                phrases = [r[0] for r in self._db.execute(
+                    """SELECT s.text FROM sentence_themes st JOIN sentences s ON s.id = st.sentence_id
+                       WHERE st.theme = ? AND s.snapshot_id = ? ORDER BY s.position LIMIT ?""",
+                    (t, snap, max_ex),
+                )]
+                if phrases:
+                    results.append((t, sc, phrases))
+        return results
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CorpusStore()
+        return _store
@@ -0,0 +1,129 @@
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urldefrag, urlparse
+
+from bs4 import BeautifulSoup
+
+from http_client import TIMEOUT, get_session
+
+# Extensions qu'on ne suit jamais (pas du texte de programme)
+SKIP_EXT = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".zip", ".mp4", ".mp3", ".css", ".js")
+
+
+class HostLimiter:
+    """Limite le nombre de requêtes simultanées et impose un délai par hôte."""
+
+    def __init__(self, per_host=2, delay=0.5):
+        self.per_host = per_host
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._sems = {}
+        self._next_slot = {}
+
+    def _sem(self, host):
+        with self._lock:
+            if host not in self._sems:
+                self._sems[host] = threading.Semaphore(self.per_host)
+            return self._sems[host]
+
+    def _wait_turn(self, host):
+        # Réserve le prochain créneau de l'hôte puis dort jusqu'à lui
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+    def fetch(self, session, url, headers=None):
+        host = urlparse(url).netloc
+        with self._sem(host):
+            self._wait_turn(host)
+            r = session.get(url, headers=headers, timeout=TIMEOUT)
+            if r.status_code != 304:
+                r.raise_for_status()
+            return r
+
+
+def normalize_url(url):
+    """URL sans fragment ni / final (clé des pages visitées et du corpus)."""
+    return urldefrag(url)[0].rstrip("/")
+
+def _same_domain(url, domains):
+    return urlparse(url).netloc in domains
+
+def extract_links(html, base_url):
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    for a in soup.find_all("a", href=True):
+        link = normalize_url(urljoin(base_url, a["href"]))
+        if link.startswith(("http://", "https://")) and not link.lower().endswith(SKIP_EXT):
+            links.append(link)
+    return links
+
+def sitemap_urls(session, root_url, limiter):
+    """Entrées <loc> du sitemap.xml du site (liste vide si absent)."""
+    p = urlparse(root_url)
+    try:
+        r = limiter.fetch(session, f"{p.scheme}://{p.netloc}/sitemap.xml")
+        return [normalize_url(u) for u in re.findall(r"<loc>\s*([^<\s]+)\s*</loc>", r.text)]
+    except Exception:
+        return []
+
+def crawl(urls, html_to_text, max_depth=0, use_sitemap=False, max_pages=50,
+          max_workers=8, per_host=2, delay=0.5, cache=None):
+    """
+    Télécharge toutes les URLs fournies en parallèle, puis (optionnel) les liens
+    du même domaine jusqu'à max_depth et les entrées du sitemap.
+
+    Renvoie une liste [(url, texte)] dans l'ordre de découverte.
+    Les pages en erreur sont ignorées. Si cache (HttpCache) est fourni, les
+    pages passent par lui (revalidation conditionnelle, mode hors-ligne).
+    """
+    session = get_session()
+    limiter = HostLimiter(per_host=per_host, delay=delay)
+    domains = {urlparse(u).netloc for u in urls}
+
+    seen = set()
+    frontier = []
+    for u in urls:
+        n = normalize_url(u)
+        if n not in seen:
+            seen.add(n)
+            frontier.append(n)
+    if use_sitemap and not (cache is not None and cache.offline):
+        for root in urls:
+            for u in sitemap_urls(session, root, limiter):
+                if u not in seen and _same_domain(u, domains) and len(seen) < max_pages:
+                    seen.add(u)
+                    frontier.append(u)
+
+    def fetch_one(url):
+        try:
+            if cache is not None:
+                return url, cache.fetch(url, request=lambda u, h: limiter.fetch(session, u, h))
+            return url, limiter.fetch(session, url).text
+        except Exception:
+            return url, None
+
+    pages = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        depth = 0
+        while frontier:
+            next_frontier = []
+            for url, html in pool.map(fetch_one, frontier):
+                if html is None:
+                    continue
+                text = html_to_text(html)
+                if text:
+                    pages.append((url, text))
+                if depth < max_depth:
+                    for link in extract_links(html, url):
+                        if link not in seen and _same_domain(link, domains) and len(seen) < max_pages:
+                            seen.add(link)
+                            next_frontier.append(link)
+            frontier = next_frontier
+            depth += 1
+    return pages
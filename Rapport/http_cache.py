@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import threading
+import time
+
+from http_client import get_session, TIMEOUT
+
+CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+# Durée pendant laquelle une entrée est servie sans revalidation (secondes)
+CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", 24 * 3600))
+# Taille max des corps stockés (octets), éviction LRU au-delà
+CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+# Mode hors-ligne : uniquement le cache, jamais le réseau
+CACHE_OFFLINE = os.getenv("HTTP_CACHE_OFFLINE", "0") == "1"
+
+
+def open_db(path):
+    """
+    Connexion SQLite partagée entre threads, pour tous les fichiers de CACHE_DIR.
+    Plusieurs process peuvent écrire dans le même fichier (workers de batch.py,
+    démon de rafraîchissement à côté de l'app) : WAL laisse les lectures
+    avancer pendant une écriture, timeout attend le verrou au lieu d'échouer.
+    """
+    db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    db.execute("PRAGMA journal_mode=WAL")
+    return db
+
+
+class CacheMiss(Exception):
+    pass
+
+
+class HttpCache:
+    """
+    Cache HTTP persistant (SQLite) indexé par URL.
+
+    Chaque entrée garde le corps, l'ETag et le Last-Modified. Passé le TTL,
+    l'entrée est revalidée avec If-None-Match / If-Modified-Since (304 = on
+    garde le corps). En cas d'erreur réseau, l'entrée périmée est servie.
+    """
+
+    def __init__(self, path=None, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, offline=CACHE_OFFLINE):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "http.sqlite")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._db = open_db(path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )""")
+        self._db.commit()
+
+    def _lookup(self, url):
+        with self._lock:
+            return self._db.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+    def _touch(self, url, revalidated=False):
+        now = time.time()
+        with self._lock:
+            if revalidated:
+                self._db.execute("UPDATE pages SET last_access = ?, fetched_at = ? WHERE url = ?", (now, now, url))
+            else:
+                self._db.execute("UPDATE pages SET last_access = ? WHERE url = ?", (now, url))
+            self._db.commit()
+
+    def _store(self, url, body, etag, last_modified):
+        now = time.time()
+        size = len(body.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, now, now, size),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._db.execute("SELECT url, size FROM pages ORDER BY last_access").fetchall():
+            self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def fetch(self, url, request=None, max_age=None):
+        """
+        Renvoie le texte de la page.
+        request(url, headers) -> requests.Response ; par défaut la session partagée.
+        max_age : remplace le TTL pour cet appel (0 = toujours revalider).
+        Lève CacheMiss en mode hors-ligne si l'URL n'est pas en cache.
+        """
+        entry = self._lookup(url)
+        if self.offline:
+            if entry is None:
+                raise CacheMiss(url)
+            self._touch(url)
+            return entry[0]
+        ttl = self.ttl if max_age is None else max_age
+        if entry is not None and time.time() - entry[3] < ttl:
+            self._touch(url)
+            return entry[0]
+
+        headers = {}
+        if entry is not None:
+            if entry[1]: headers["If-None-Match"] = entry[1]
+            if entry[2]: headers["If-Modified-Since"] = entry[2]
+        if request is None:
+            request = lambda u, h: get_session().get(u, headers=h, timeout=TIMEOUT)
+        try:
+            r = request(url, headers)
+            if r.status_code == 304 and entry is not None:
+                self._touch(url, revalidated=True)
+                return entry[0]
+            r.raise_for_status()
+        except Exception:
+            if entry is not None:
+                return entry[0]
+            raise
+        self._store(url, r.text, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        return r.text
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM pages")
+            self._db.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Instance partagée du cache (créée au premier appel)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache()
+        return _cache
@@ -0,0 +1,26 @@
+import threading
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+TIMEOUT = 10
+
+_sessions = {}
+_lock = threading.Lock()
+
+def get_session(name="default", pool_size=16):
+    """
+    Session HTTP partagée par nom (keep-alive + pool de connexions).
+    Une session par usage ("default" pour les pages, "images" pour les téléchargements).
+    """
+    with _lock:
+        s = _sessions.get(name)
+        if s is None:
+            # Import au premier usage : l'interface s'affiche sans charger requests
+            import requests
+            from requests.adapters import HTTPAdapter
+            s = requests.Session()
+            s.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _sessions[name] = s
+        return s
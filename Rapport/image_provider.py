@@ -1,39 +1,97 @@
 import os
 import io
 import base64  # Ajout nécessaire pour le décodage si Azure envoie du code au lieu d'une URL
-import requests
+import threading
+import time
 from abc import ABC, abstractmethod
-from PIL import Image, ImageDraw, ImageFont
+from config import PROMPT_MAX_CHARS
+from http_client import get_session, TIMEOUT
+from instrumentation import span, traced
+
+# Taille max d'une image téléchargée (octets)
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", 20 * 1024 * 1024))
+DOWNLOAD_CHUNK = 256 * 1024
+# Délai simulé du mode Dummy (secondes), 0 = instantané
+DUMMY_DELAY = float(os.getenv("DUMMY_DELAY", "0"))
+
+class ContentFilterError(ValueError):
+    """Génération refusée par le filtre de contenu : inutile de réessayer le même prompt."""
+
+
+def is_content_filter(exc):
+    """Refus du filtre de contenu Azure (erreur 400 content_policy_violation / content_filter)."""
+    if isinstance(exc, ContentFilterError):
+        return True
+    return getattr(exc, "code", None) in ("content_policy_violation", "content_filter")
+
 
 class ImageProvider(ABC):
     @abstractmethod
     def generate_image(self, prompt: str, log_callback=None) -> bytes:
         pass
 
+def download_image(url, max_bytes=MAX_IMAGE_BYTES):
+    """
+    Télécharge une image en streaming (session keep-alive partagée) dans un
+    buffer préalloué d'après Content-Length ; refuse au-delà de max_bytes.
+    """
+    with get_session("images").get(url, stream=True, timeout=TIMEOUT) as r:
+        r.raise_for_status()
+        length = int(r.headers.get("Content-Length") or 0)
+        if length > max_bytes:
+            raise ValueError(f"Image trop volumineuse ({length} octets, max {max_bytes}).")
+        buf = bytearray(length)
+        view = memoryview(buf)
+        pos = 0
+        for chunk in r.iter_content(DOWNLOAD_CHUNK):
+            end = pos + len(chunk)
+            if end > max_bytes:
+                raise ValueError(f"Image trop volumineuse (> {max_bytes} octets).")
+            if end <= length:
+                view[pos:end] = chunk
+            else:
+                # Content-Length absent ou faux : on agrandit le buffer
+                view.release()
+                del buf[pos:]
+                buf += chunk
+                view = memoryview(buf)
+                length = len(buf)
+            pos = end
+        view.release()
+        if pos < len(buf):
+            del buf[pos:]
+        return bytes(buf)
+
 class DummyProvider(ImageProvider):
+    _placeholder = None
+    _placeholder_lock = threading.Lock()
+
+    @classmethod
+    def placeholder(cls):
+        """Image de démonstration rendue une seule fois par process."""
+        with cls._placeholder_lock:
+            if cls._placeholder is None:
+                from PIL import Image, ImageDraw   # import lourd, seulement pour le mode Dummy
+                img = Image.new('RGB', (1024, 1024), color=(73, 109, 137))
+                d = ImageDraw.Draw(img)
+                d.text((50, 400), "BD Satirique Générée (Mode Dummy)", fill=(255, 255, 0))
+                d.text((50, 450), "Configurez Azure OpenAI pour de vraies images.", fill=(255, 255, 255))
+                img_byte_arr = io.BytesIO()
+                img.save(img_byte_arr, format='PNG')
+                cls._placeholder = img_byte_arr.getvalue()
+            return cls._placeholder
+
+    @traced("image")
     def generate_image(self, prompt: str, log_callback=None) -> bytes:
-        if log_callback: log_callback("[Dummy] Début de la génération locale...", "info")
+        if log_callback: log_callback(f"[Dummy] Début de la génération locale (prompt de {len(prompt)} caractères)...", "info")
         
-        # Simulation d'un petit délai pour le réalisme
-        import time
-        time.sleep(1)
-        
-        img = Image.new('RGB', (1024, 1024), color=(73, 109, 137))
-        d = ImageDraw.Draw(img)
-        try:
-            font = ImageFont.load_default()
-        except:
-            font = None
-            
-        d.text((50, 400), "BD Satirique Générée (Mode Dummy)", fill=(255, 255, 0))
-        d.text((50, 450), "Configurez Azure OpenAI pour de vraies images.", fill=(255, 255, 255))
-        d.text((50, 500), f"Prompt reçu ({len(prompt)} chars)", fill=(255, 255, 255))
-        
-        img_byte_arr = io.BytesIO()
-        img.save(img_byte_arr, format='PNG')
+        # Délai simulé optionnel (DUMMY_DELAY)
+        if DUMMY_DELAY:
+            time.sleep(DUMMY_DELAY)
+        image = self.placeholder()
         
         if log_callback: log_callback("[Dummy] Image générée avec succès.", "success")
-        return img_byte_arr.getvalue()
+        return image
 
 class AzureOpenAIProvider(ImageProvider):
     def __init__(self):
@@ -42,6 +100,8 @@ class AzureOpenAIProvider(ImageProvider):
         self.api_key = os.getenv("AZURE_OPENAI_API_KEY")
         self.api_version = os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
         self.deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "dall-e-3")
+        # Paramètres envoyés à images.generate (font partie de la clé du cache d'images)
+        self.generation_params = {"n": 1}
 
         if not self.endpoint or not self.api_key:
             raise ValueError("Variables d'environnement Azure manquantes.")
@@ -59,17 +119,21 @@ class AzureOpenAIProvider(ImageProvider):
             log_callback(f"[Azure] Modèle cible: {self.deployment}", "info")
             log_callback(f"[Azure] Envoi du prompt ({len(prompt)} caractères)...", "info")
 
-        # Tronquer pour sécurité DALL-E (max ~4000 chars)
-        safe_prompt = prompt[:3900] 
+        # Dernier garde-fou DALL-E (max ~4000 chars) : le prompt builder remplit
+        # déjà les extraits au budget, une coupe ici signale un gabarit trop long
+        safe_prompt = prompt[:PROMPT_MAX_CHARS]
+        if len(prompt) > PROMPT_MAX_CHARS and log_callback:
+            log_callback(f"[Azure] Prompt tronqué à {PROMPT_MAX_CHARS} caractères ({len(prompt) - PROMPT_MAX_CHARS} perdus).", "warning")
         
         try:
-            result = self.client.images.generate(
-                model=self.deployment,
-                prompt=safe_prompt,
-                n=1,
-                # On ne force pas le format ici pour voir ce que le serveur préfère,
-                # mais le code ci-dessous gèrera les deux cas (url ou b64_json).
-            )
+            with span("image_api", len(safe_prompt)):
+                result = self.client.images.generate(
+                    model=self.deployment,
+                    prompt=safe_prompt,
+                    **self.generation_params,
+                    # On ne force pas le format ici pour voir ce que le serveur préfère,
+                    # mais le code ci-dessous gèrera les deux cas (url ou b64_json).
+                )
             
             if log_callback: log_callback("[Azure] Réponse API reçue. Analyse du format...", "info")
             
@@ -84,11 +148,12 @@ class AzureOpenAIProvider(ImageProvider):
                 image_url = first_item.url
                 if log_callback: log_callback(f"[Azure] Mode URL détecté. Téléchargement...", "info")
                 
-                response = requests.get(image_url)
-                response.raise_for_status()
+                with span("image_download") as s:
+                    image_data = download_image(image_url)
+                    s["bytes"] = len(image_data)
                 
                 if log_callback: log_callback("[Azure] Image téléchargée avec succès.", "success")
-                return response.content
+                return image_data
             
             # CAS 2 : L'API renvoie du Base64 (Cas fréquent sur certaines configs Azure)
             elif getattr(first_item, 'b64_json', None):
@@ -102,18 +167,38 @@ class AzureOpenAIProvider(ImageProvider):
             else:
                 revised_prompt = getattr(first_item, 'revised_prompt', 'Non disponible')
                 error_details = f"Raison possible : Filtre de contenu (Content Filter). Prompt révisé : {revised_prompt}"
-                raise ValueError(f"Azure n'a renvoyé ni URL ni image. {error_details}")
+                raise ContentFilterError(f"Azure n'a renvoyé ni URL ni image. {error_details}")
 
         except Exception as e:
             error_msg = str(e)
             if log_callback: log_callback(f"[Azure] ERREUR CRITIQUE: {error_msg}", "error")
+            if isinstance(e, ContentFilterError): raise
+            if is_content_filter(e): raise ContentFilterError("⚠️ Image censurée par Azure (Sécurité).") from e
             raise e
 
+_providers = {}
+_providers_lock = threading.Lock()
+
 def get_provider() -> ImageProvider:
+    """
+    Provider partagé (registre) : le client AzureOpenAI et son pool de
+    connexions sont créés une fois par configuration, pas à chaque clic.
+    """
     if os.getenv("AZURE_OPENAI_API_KEY") and os.getenv("AZURE_OPENAI_ENDPOINT"):
-        try:
-            return AzureOpenAIProvider()
-        except Exception as e:
-            print(f"Erreur init Azure: {e}. Fallback sur Dummy.")
-            return DummyProvider()
-    return DummyProvider()
\ No newline at end of file
+        key = ("azure", os.getenv("AZURE_OPENAI_ENDPOINT"), os.getenv("AZURE_OPENAI_API_KEY"),
+               os.getenv("AZURE_OPENAI_API_VERSION"), os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"))
+    else:
+        key = ("dummy",)
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            if key[0] == "azure":
+                try:
+                    provider = AzureOpenAIProvider()
+                except Exception as e:
+                    print(f"Erreur init Azure: {e}. Fallback sur Dummy.")
+                    provider = DummyProvider()
+            else:
+                provider = DummyProvider()
+            _providers[key] = provider
+        return provider
\ No newline at end of file
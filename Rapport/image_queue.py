@@ -0,0 +1,135 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from image_provider import is_content_filter
+
+# Codes HTTP pour lesquels on réessaie (throttling / erreurs serveur transitoires)
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Seau à jetons : au plus `rate` requêtes par seconde, rafales jusqu'à `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _status_code(exc):
+    code = getattr(exc, "status_code", None)
+    if code is None and getattr(exc, "response", None) is not None:
+        code = getattr(exc.response, "status_code", None)
+    return code
+
+def is_retryable(exc):
+    """Throttling, 5xx, timeouts et coupures réseau ; jamais le filtre de contenu."""
+    if is_content_filter(exc):
+        return False
+    code = _status_code(exc)
+    if code is not None:
+        return code in RETRY_STATUS
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError", "ConnectionError", "Timeout")
+
+def _retry_after(exc):
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ImageQueue:
+    """
+    File de génération d'images au-dessus de n'importe quel ImageProvider.
+
+    - max_in_flight requêtes simultanées au maximum (pool de threads)
+    - rate_per_minute : limitation par seau à jetons
+    - retries avec backoff exponentiel + jitter sur 429/5xx (Retry-After respecté)
+    - plusieurs variantes par prompt
+    Les événements sont remontés via log_callback(message, niveau).
+    """
+
+    def __init__(self, provider, max_in_flight=4, rate_per_minute=30, burst=2,
+                 max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.provider = provider
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="image")
+
+    def _generate(self, prompt, label, log_callback, variant=0):
+        # Un cache d'images doit distinguer les variantes d'un même prompt
+        extra = {"variant": variant} if getattr(self.provider, "accepts_variant", False) else {}
+        # Image déjà en cache : ni jeton consommé ni appel au provider
+        lookup = getattr(self.provider, "lookup", None)
+        if lookup is not None:
+            image = lookup(prompt, **extra)
+            if image is not None:
+                if log_callback: log_callback(f"[Queue] {label} servie depuis le cache.", "success")
+                return image
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                image = self.provider.generate_image(prompt, log_callback=log_callback, **extra)
+                if log_callback: log_callback(f"[Queue] {label} terminée.", "success")
+                return image
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    if log_callback: log_callback(f"[Queue] {label} abandonnée : {e}", "error")
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    # Backoff exponentiel avec "full jitter"
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                attempt += 1
+                if log_callback:
+                    log_callback(f"[Queue] {label} : erreur transitoire ({e}), nouvel essai {attempt}/{self.max_retries} dans {delay:.1f}s", "warning")
+                time.sleep(delay)
+
+    def submit(self, prompt, variants=1, log_callback=None, label=None):
+        """Lance `variants` générations du même prompt ; renvoie une liste de Futures."""
+        return [
+            self._pool.submit(self._generate, prompt, label or f"Variante {i + 1}/{variants}", log_callback, i)
+            for i in range(variants)
+        ]
+
+    def generate_many(self, prompts, variants=1, log_callback=None):
+        """
+        Génère toutes les variantes de plusieurs prompts en parallèle.
+        Renvoie {clé: [bytes ou Exception]} ; prompts est un dict {clé: prompt} ou une liste.
+        """
+        if not isinstance(prompts, dict):
+            prompts = dict(enumerate(prompts))
+        futures = {key: self.submit(p, variants, log_callback) for key, p in prompts.items()}
+        results = {}
+        for key, futs in futures.items():
+            results[key] = []
+            for f in futs:
+                try:
+                    results[key].append(f.result())
+                except Exception as e:
+                    results[key].append(e)
+        return results
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from http_cache import CACHE_DIR
+from image_provider import ImageProvider
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(CACHE_DIR, "images"))
+# Quota disque des images générées (octets), éviction LRU au-delà
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+
+
+def image_key(prompt, provider, variant=0):
+    """Hash du prompt + modèle/déploiement + paramètres de génération."""
+    payload = json.dumps({
+        "provider": type(provider).__name__,
+        "deployment": getattr(provider, "deployment", None),
+        "params": getattr(provider, "generation_params", {}),
+        "prompt": prompt,
+        "variant": variant,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedImageProvider(ImageProvider):
+    """
+    Magasin d'images adressé par contenu devant n'importe quel ImageProvider.
+
+    Un prompt identique (même déploiement, mêmes paramètres) ne coûte plus
+    d'appel : l'image est relue sur disque. Les écritures sont atomiques
+    (fichier temporaire + os.replace), donc plusieurs workers peuvent
+    partager le dossier. L'accès met à jour la date du fichier, qui sert
+    d'ordre LRU pour respecter le quota.
+    """
+
+    # image_queue passe variant=i pour que chaque variante ait sa propre entrée
+    accepts_variant = True
+
+    def __init__(self, provider, directory=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_BYTES):
+        self.provider = provider
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".png")
+
+    def _write_atomic(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".png"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue  # supprimé par un autre worker
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, name in sorted(entries):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def lookup(self, prompt, variant=0):
+        """Image déjà en cache (bytes) ou None, sans appeler le provider."""
+        path = self._path(image_key(prompt, self.provider, variant))
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # LRU : accès récent
+        except FileNotFoundError:
+            pass
+        return data
+
+    def generate_image(self, prompt: str, log_callback=None, force=False, variant=0) -> bytes:
+        if not force:
+            data = self.lookup(prompt, variant)
+            if data is not None:
+                if log_callback: log_callback("[Cache] Image identique déjà générée, relue sur disque.", "success")
+                return data
+        path = self._path(image_key(prompt, self.provider, variant))
+        data = self.provider.generate_image(prompt, log_callback=log_callback)
+        with self._lock:
+            self._write_atomic(path, data)
+            self._evict()
+        return data
+
+
+_cached = {}
+_cached_lock = threading.Lock()
+
+def get_cached_provider():
+    """CachedImageProvider partagé devant le provider du registre (image_provider.get_provider)."""
+    from image_provider import get_provider
+    base = get_provider()
+    with _cached_lock:
+        provider = _cached.get(id(base))
+        if provider is None or provider.provider is not base:
+            provider = CachedImageProvider(base)
+            _cached[id(base)] = provider
+        return provider
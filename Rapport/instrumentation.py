@@ -0,0 +1,145 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource  # absent sous Windows
+except ImportError:
+    resource = None
+
+# Fichier JSONL où chaque trace terminée est ajoutée (monitoring) ; vide = désactivé
+TRACE_JSONL = os.getenv("TRACE_JSONL", "")
+# Pic mémoire précis par étape via tracemalloc (coûteux, désactivé par défaut)
+TRACE_MEMORY = os.getenv("TRACE_MEMORY", "0") == "1"
+
+_local = threading.local()
+
+
+def _rss_bytes():
+    """RSS actuelle du process (/proc sous Linux) ; à défaut son pic (ru_maxrss)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux : Ko, macOS : octets
+    return rss if os.uname().sysname == "Darwin" else rss * 1024
+
+
+class Trace:
+    """
+    Ensemble de spans d'une exécution (un clic, un job batch...).
+
+    Chaque span enregistre : étape, durée, octets traités et mémoire : pic
+    des allocations de l'étape (tracemalloc si TRACE_MEMORY=1), sinon
+    variation de la RSS du process entre début et fin de l'étape.
+    """
+
+    def __init__(self, name, log_callback=None):
+        self.name = name
+        self.log_callback = log_callback
+        self.started = time.time()
+        self.records = []
+        self._stack = []
+
+    def as_dict(self):
+        return {"trace": self.name, "started": self.started, "spans": self.records}
+
+    def to_jsonl(self):
+        return "\n".join(json.dumps(dict(r, trace=self.name), ensure_ascii=False) for r in self.records)
+
+    def summary(self):
+        """Durée totale par étape : {étape: secondes}."""
+        totals = {}
+        for r in self.records:
+            totals[r["stage"]] = totals.get(r["stage"], 0.0) + r["seconds"]
+        return totals
+
+
+@contextmanager
+def trace(name, log_callback=None, jsonl_path=None):
+    """Active une trace pour le thread courant ; les spans s'y enregistrent."""
+    t = Trace(name, log_callback)
+    previous = getattr(_local, "trace", None)
+    _local.trace = t
+    started_tracing = TRACE_MEMORY and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        yield t
+    finally:
+        _local.trace = previous
+        if started_tracing:
+            tracemalloc.stop()
+        path = jsonl_path or TRACE_JSONL
+        if path and t.records:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(t.to_jsonl() + "\n")
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def span(stage, nbytes=None):
+    """
+    Mesure une étape. Sans trace active, ne fait rien (coût quasi nul).
+    On peut renseigner les octets en cours de route : `s["bytes"] = len(html)`.
+    """
+    t = current_trace()
+    if t is None:
+        yield {}
+        return
+    record = {"stage": stage, "bytes": nbytes}
+    rss_before = None
+    if tracemalloc.is_tracing():
+        parent_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+    else:
+        rss_before = _rss_bytes()
+    t._stack.append(record)
+    t0 = time.perf_counter()
+    error = None
+    try:
+        yield record
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        record["seconds"] = time.perf_counter() - t0
+        t._stack.pop()
+        if tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], record.pop("_child_peak", 0))
+            record["peak_bytes"] = peak
+            # Le reset_peak de ce span ne doit pas masquer le pic du span parent
+            if t._stack:
+                parent = t._stack[-1]
+                parent["_child_peak"] = max(parent.get("_child_peak", 0), peak, parent_peak)
+        elif rss_before is not None:
+            record["rss_delta_bytes"] = _rss_bytes() - rss_before
+        if error is not None:
+            record["error"] = str(error)
+        record["depth"] = len(t._stack)
+        t.records.append(record)
+        if t.log_callback:
+            size = f", {record['bytes'] / 1024:.0f} Ko" if record.get("bytes") else ""
+            t.log_callback(f"[Perf] {stage} : {record['seconds'] * 1000:.0f} ms{size}", "error" if error else "info")
+
+
+def traced(stage):
+    """Décorateur : la fonction entière devient un span."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
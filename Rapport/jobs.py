@@ -0,0 +1,181 @@
+"""
+Tâches de fond partagées entre sessions Streamlit (scraping, génération
+d'images) : le script de l'interface ne reste plus bloqué pendant les appels
+réseau, il interroge l'état de la tâche à chaque rerun.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import trace
+
+# Threads du pool partagé (toutes sessions confondues)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+# Tâches terminées gardées pour être relues (les plus anciennes sont oubliées)
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", 200))
+MAX_LOG_LINES = 200
+
+PENDING, RUNNING, DONE, ERROR, CANCELLED = "pending", "running", "done", "error", "cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """
+    Une tâche : identifiant, état, messages de progression, résultat.
+    La trace (spans) de l'exécution est gardée dans `trace`.
+    """
+
+    def __init__(self, key, name):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.name = name
+        self.status = PENDING
+        self.logs = []
+        self.result = None
+        self.error = None
+        self.trace = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.subscribers = 1
+        self._cancel = threading.Event()
+        self.future = None
+
+    @property
+    def active(self):
+        return self.status in (PENDING, RUNNING)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def log(self, msg, level="info"):
+        """log_callback passé à la tâche ; c'est aussi le point d'annulation."""
+        self.logs = (self.logs + [(level, msg)])[-MAX_LOG_LINES:]
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+
+class JobRunner:
+    """
+    Pool de threads partagé, avec déduplication : deux soumissions avec la
+    même clé pendant qu'une tâche est en cours reçoivent le même job (un seul
+    téléchargement pour deux utilisateurs qui scrapent la même URL).
+
+    L'annulation est coopérative : une tâche en attente est retirée du pool ;
+    une tâche en cours s'arrête au prochain message de progression
+    (log_callback ou fin de span). Une tâche partagée n'est annulée que
+    lorsque tous ses demandeurs l'ont annulée.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, history=JOB_HISTORY):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()      # id -> Job
+        self._in_flight = {}            # clé -> Job actif
+        self.history = history
+
+    def submit(self, key, fn, *args, name=None, **kwargs):
+        """
+        Lance fn(*args, log_callback=job.log, **kwargs) en tâche de fond et
+        renvoie l'id du job (celui du job en cours si la clé est déjà soumise).
+        """
+        with self._lock:
+            job = self._in_flight.get(key)
+            if job is not None and job.active and not job.cancel_requested:
+                job.subscribers += 1
+                return job.id
+            job = Job(key, name or getattr(fn, "__name__", "job"))
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+            self._forget_finished()
+            job.future = self._pool.submit(self._run, job, fn, args, kwargs)
+            return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_requested:
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        job.started = time.time()
+        try:
+            with trace(job.name, log_callback=job.log) as t:
+                job.trace = t
+                result = fn(*args, log_callback=job.log, **kwargs)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            job.error = str(e)
+            self._finish(job, CANCELLED if job.cancel_requested else ERROR)
+        else:
+            job.result = result
+            # Une fonction qui avale les exceptions peut terminer malgré l'annulation
+            self._finish(job, CANCELLED if job.cancel_requested else DONE)
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished = time.time()
+        with self._lock:
+            if self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+
+    def _forget_finished(self):
+        excess = len(self._jobs) - self.history
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if not self._jobs[job_id].active:
+                del self._jobs[job_id]
+                excess -= 1
+
+    def get(self, job_id):
+        """Job (état, progression, résultat) ou None s'il est inconnu/oublié."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Retire un demandeur ; annule la tâche quand il n'en reste plus aucun."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return False
+            job.subscribers -= 1
+            if job.subscribers > 0:
+                return False
+            job._cancel.set()
+            if self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)
+        return True
+
+    def wait(self, job_id, timeout=None):
+        """Attend la fin d'un job (mode script / tests) et le renvoie."""
+        job = self.get(job_id)
+        if job is not None and job.future is not None:
+            try:
+                job.future.result(timeout)
+            except Exception:
+                pass
+        return job
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+def get_job_runner():
+    """Pool partagé par tout le process (toutes les sessions Streamlit)."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
@@ -0,0 +1,70 @@
+from collections import Counter
+
+# Taille max du cache token -> rang (vidé au-delà, pour les gros lots)
+CACHE_MAX = 200_000
+
+
+class KeywordMatcher:
+    """
+    Automate de préfixes (trie) compilé une seule fois à partir d'un
+    dictionnaire {thème: [mots-clés]}.
+
+    Règle de correspondance identique à l'ancienne boucle de scraper.py :
+    un token appartient au PREMIER thème (ordre du dict) dont un mot-clé est
+    préfixe du token ; le mot-clé compté est le premier de la liste de ce thème.
+    """
+
+    def __init__(self, themes_definitions):
+        self.themes = list(themes_definitions.keys())
+        self.keywords = [list(kws) for kws in themes_definitions.values()]
+        # Chaque noeud : [enfants (dict), meilleur rang (theme_idx, kw_idx) ou None]
+        self._root = [{}, None]
+        for ti, kws in enumerate(self.keywords):
+            for ki, kw in enumerate(kws):
+                node = self._root
+                for ch in kw:
+                    node = node[0].setdefault(ch, [{}, None])
+                if node[1] is None or (ti, ki) < node[1]:
+                    node[1] = (ti, ki)
+        # Cache token -> rang : les tokens d'une page se répètent énormément
+        self._cache = {}
+
+    def match(self, token):
+        """Renvoie (theme_idx, kw_idx) du mot-clé gagnant, ou None."""
+        try:
+            return self._cache[token]
+        except KeyError:
+            pass
+        best = None
+        node = self._root
+        for ch in token:
+            node = node[0].get(ch)
+            if node is None:
+                break
+            if node[1] is not None and (best is None or node[1] < best):
+                best = node[1]
+        if len(self._cache) >= CACHE_MAX:
+            self._cache.clear()
+        self._cache[token] = best
+        return best
+
+    def score(self, tokens):
+        """
+        Score un flux de tokens en une seule passe.
+
+        Renvoie (scores, keyword_hits) :
+        - scores : {thème: nombre de tokens} pour tous les thèmes (ordre d'origine)
+        - keyword_hits : {thème: Counter({mot-clé: nombre de tokens})}
+        """
+        hits = Counter()
+        for tok in tokens:
+            rank = self.match(tok)
+            if rank is not None:
+                hits[rank] += 1
+        scores = {t: 0 for t in self.themes}
+        keyword_hits = {t: Counter() for t in self.themes}
+        for (ti, ki), n in hits.items():
+            theme = self.themes[ti]
+            scores[theme] += n
+            keyword_hits[theme][self.keywords[ti][ki]] += n
+        return scores, keyword_hits
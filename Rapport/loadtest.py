@@ -0,0 +1,138 @@
+"""
+Générateur de charge pour le chemin image : N requêtes concurrentes à travers
+AzureOpenAIProvider (client openai réel), par défaut contre le stub local.
+Rapporte les latences p50/p95/p99, le débit et les erreurs par type.
+
+Exemples :
+    python loadtest.py --requests 200 --concurrency 16 --latency lognormal:-1:0.5
+    python loadtest.py --queue --rate-429 0.2 --concurrency 8
+    python loadtest.py --endpoint http://127.0.0.1:8089 --requests 50   # stub déjà lancé
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from azure_stub import add_stub_arguments, config_from_args, start_stub
+
+
+def percentile(sorted_values, p):
+    """Percentile par rang le plus proche sur une liste triée."""
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def classify(exc):
+    from image_provider import is_content_filter
+    if is_content_filter(exc):
+        return "content_filter"
+    code = getattr(exc, "status_code", None)
+    return str(code) if code is not None else type(exc).__name__
+
+
+def make_provider(endpoint, client_retries=0):
+    os.environ["AZURE_OPENAI_ENDPOINT"] = endpoint
+    os.environ.setdefault("AZURE_OPENAI_API_KEY", "stub")
+    from image_provider import AzureOpenAIProvider
+    provider = AzureOpenAIProvider()
+    # Les retries du client openai masqueraient les 429/500 : désactivés par défaut
+    provider.client = provider.client.with_options(max_retries=client_retries)
+    return provider
+
+
+def run_load(provider, n_requests, concurrency, use_queue=False, rate_per_minute=6000, prompt="Planche BD de test."):
+    """Lance les requêtes ; renvoie [(latence en secondes, issue)]."""
+    queue = None
+    if use_queue:
+        from image_queue import ImageQueue
+        queue = ImageQueue(provider, max_in_flight=concurrency, rate_per_minute=rate_per_minute,
+                           burst=concurrency, base_delay=0.2, max_delay=5.0)
+
+    def one(i):
+        t0 = time.perf_counter()
+        try:
+            if queue is not None:
+                queue.submit(f"{prompt} #{i}", 1)[0].result()
+            else:
+                provider.generate_image(f"{prompt} #{i}")
+            return time.perf_counter() - t0, "ok"
+        except Exception as e:
+            return time.perf_counter() - t0, classify(e)
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(one, range(n_requests)))
+    finally:
+        if queue is not None:
+            queue.shutdown()
+
+
+def summarize(results, elapsed):
+    ok = sorted(lat for lat, outcome in results if outcome == "ok")
+    errors = {}
+    for _, outcome in results:
+        if outcome != "ok":
+            errors[outcome] = errors.get(outcome, 0) + 1
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "p50_s": percentile(ok, 50),
+        "p95_s": percentile(ok, 95),
+        "p99_s": percentile(ok, 99),
+        "max_s": ok[-1] if ok else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge du chemin image (Azure OpenAI ou stub local).")
+    parser.add_argument("--requests", type=int, default=100, help="Nombre total de requêtes.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requêtes simultanées.")
+    parser.add_argument("--endpoint", help="Endpoint existant (sinon un stub local est démarré).")
+    parser.add_argument("--queue", action="store_true", help="Passer par ImageQueue (retries + rate limit).")
+    parser.add_argument("--rate", type=float, default=6000, help="Rate limit de la file (requêtes/minute).")
+    parser.add_argument("--client-retries", type=int, default=0, help="Retries internes du client openai.")
+    parser.add_argument("--json", help="Écrire le rapport en JSON.")
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    stub = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        stub = start_stub(config_from_args(args))
+        endpoint = stub.endpoint
+    try:
+        provider = make_provider(endpoint, args.client_retries)
+        t0 = time.perf_counter()
+        results = run_load(provider, args.requests, args.concurrency, args.queue, args.rate)
+        report = summarize(results, time.perf_counter() - t0)
+    finally:
+        if stub is not None:
+            report_stub = dict(stub.config.counts)
+            stub.shutdown()
+    if stub is not None:
+        report["server"] = report_stub
+
+    fmt = lambda s: f"{s * 1000:.0f} ms" if s is not None else "-"
+    print(f"{report['ok']}/{report['requests']} réussies en {report['elapsed_s']:.2f}s "
+          f"({report['throughput_rps']:.1f} img/s, concurrence {args.concurrency}{', via ImageQueue' if args.queue else ''})")
+    print(f"latence p50 {fmt(report['p50_s'])}  p95 {fmt(report['p95_s'])}  p99 {fmt(report['p99_s'])}  max {fmt(report['max_s'])}")
+    if report["errors"]:
+        print("erreurs : " + ", ".join(f"{k}={v}" for k, v in sorted(report["errors"].items())))
+    if "server" in report:
+        print("serveur : " + ", ".join(f"{k}={v}" for k, v in report["server"].items()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
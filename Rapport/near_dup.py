@@ -0,0 +1,118 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+# Similarité de Jaccard (mots + paires de mots) à partir de laquelle deux phrases sont des quasi-doublons
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", 0.7))
+# Nombre max de signatures gardées (les plus anciennes sont oubliées)
+NEAR_DUP_CAPACITY = int(os.getenv("NEAR_DUP_CAPACITY", 50_000))
+
+# 16 bandes de 4 lignes : une paire à Jaccard 0.7 est candidate dans ~99 % des cas
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_perms = None
+
+
+def _permutations():
+    """
+    Permutations (a * h + b mod 2^64), tirées une fois avec une graine fixe
+    (signatures stables). NumPy n'est importé qu'au premier calcul.
+    """
+    global _perms
+    if _perms is None:
+        import numpy as np
+        rng = np.random.default_rng(0x5EED)
+        a = rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+        b = rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+        _perms = (np, a, b)
+    return _perms
+
+
+def shingles(text):
+    """Mots et paires de mots consécutifs, en minuscules."""
+    words = _WORD.findall(text.lower())
+    return set(words) | {a + " " + b for a, b in zip(words, words[1:])}
+
+
+def minhash(text):
+    """Signature MinHash (NUM_PERM entiers 64 bits) de la phrase."""
+    np, a, b = _permutations()
+    feats = shingles(text)
+    if not feats:
+        return np.zeros(NUM_PERM, dtype=np.uint64)
+    h = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big") for f in feats),
+        dtype=np.uint64, count=len(feats),
+    )
+    # Débordement uint64 voulu : arithmétique modulo 2^64
+    with np.errstate(over="ignore"):
+        return (np.multiply.outer(h, a) + b).min(axis=0)
+
+
+class NearDuplicateFilter:
+    """
+    Filtre de quasi-doublons en flux (MinHash + LSH par bandes).
+
+    Chaque signature est découpée en BANDS bandes ; on ne compare une phrase
+    qu'aux signatures qui partagent au moins une bande avec elle (coût
+    sous-linéaire), puis on vérifie la similarité estimée. Mémoire bornée :
+    au-delà de `capacity`, les signatures les plus anciennes sont oubliées.
+    """
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD, capacity=NEAR_DUP_CAPACITY):
+        self.threshold = threshold
+        self.capacity = capacity
+        self._buckets = [{} for _ in range(BANDS)]   # clé de bande -> {id de signature}
+        self._sigs = OrderedDict()                   # id -> signature, du plus ancien au plus récent
+        self._next_id = 0
+
+    @staticmethod
+    def _keys(sig):
+        return [sig[i * ROWS:(i + 1) * ROWS].tobytes() for i in range(BANDS)]
+
+    def _near(self, sig, keys):
+        checked = set()
+        for bucket, key in zip(self._buckets, keys):
+            for i in bucket.get(key, ()):
+                if i in checked:
+                    continue
+                checked.add(i)
+                if int((self._sigs[i] == sig).sum()) >= self.threshold * NUM_PERM:
+                    return True
+        return False
+
+    def _forget_oldest(self):
+        i, sig = self._sigs.popitem(last=False)
+        for bucket, key in zip(self._buckets, self._keys(sig)):
+            ids = bucket[key]
+            ids.discard(i)
+            if not ids:
+                del bucket[key]
+
+    def add(self, text):
+        """Enregistre la phrase ; renvoie False si c'est un quasi-doublon d'une phrase déjà vue."""
+        sig = minhash(text)
+        keys = self._keys(sig)
+        if self._near(sig, keys):
+            return False
+        i = self._next_id
+        self._next_id += 1
+        self._sigs[i] = sig
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, set()).add(i)
+        if len(self._sigs) > self.capacity:
+            self._forget_oldest()
+        return True
+
+    def __len__(self):
+        return len(self._sigs)
+
+    def filter(self, texts):
+        """Générateur : ne laisse passer que les phrases nouvelles."""
+        for t in texts:
+            if self.add(t):
+                yield t
@@ -1,3 +1,8 @@
+from config import PROMPT_MAX_CHARS
+from instrumentation import traced
+from quote_packer import pack_quotes
+
+@traced("prompt")
 def generate_bd_prompt_logic(party_name, analysis_results, satire_angle):
     if not analysis_results: return ""
     
@@ -6,16 +11,16 @@ def generate_bd_prompt_logic(party_name, analysis_results, satire_angle):
     themes_str = ", ".join([f"{t[0]}" for t in top_themes])
     
     # 2. Exemples : On prend seulement les 3 premiers thèmes
-    examples_str = ""
+    candidates = []
     for theme, freq, phrases in analysis_results[:3]:
-        examples_str += f"\n### THÈME : {theme}\n"
         for p in phrases[:2]:
             # On coupe les phrases trop longues (>150 caractères)
             clean_p = (p[:150] + "...") if len(p) > 150 else p
-            examples_str += f"- « {clean_p} »\n"
+            candidates.append((theme, clean_p))
 
     # 3. LE PROMPT EXACT QUE VOUS AVEZ DEMANDÉ
-    prompt = f"""
+    def render(examples_str):
+        return f"""
 Crée une planche de bande dessinée satirique de 4 cases inspirée du programme du parti politique "{party_name}".
 
 OBJECTIF :
@@ -61,5 +66,18 @@ CONTRAINTES STRICTES :
 - Aucun slogan ou phrase copiée mot à mot.
 - Priorité absolue à la lisibilité, à la narration visuelle et à l’impact satirique.
 """
-    # Sécurité technique pour ne jamais dépasser la limite
-    return prompt[:3900]
\ No newline at end of file
+
+    # 4. Exemples choisis pour tenir dans la limite (au lieu de couper la fin du prompt)
+    header = lambda theme: len(f"\n### THÈME : {theme}\n")
+    line = lambda theme, p: len(f"- « {p} »\n")
+    pack = pack_quotes(candidates, PROMPT_MAX_CHARS - len(render("")), line, group_cost=header)
+    examples_str = ""
+    current = None
+    for theme, p in pack.selected:
+        if theme != current:
+            examples_str += f"\n### THÈME : {theme}\n"
+            current = theme
+        examples_str += f"- « {p} »\n"
+    prompt = render(examples_str)
+    # Sécurité technique pour ne jamais dépasser la limite (gabarit seul trop long)
+    return prompt[:PROMPT_MAX_CHARS]
\ No newline at end of file
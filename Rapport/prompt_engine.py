@@ -0,0 +1,222 @@
+import hashlib
+import random
+import re
+from collections import deque
+
+from config import PROMPT_MAX_CHARS
+from instrumentation import traced
+from quote_packer import default_values, pack_quotes
+
+NO_QUOTES_MESSAGE = "Impossible de générer un prompt : aucune phrase n'a été extraite."
+
+# Gabarit du prompt BD satirique. Les emplacements {{...}} sont remplis au rendu.
+BD_TEMPLATE = """Génère UNE SEULE IMAGE : une planche de bande dessinée satirique en français.
+
+STYLE VISUEL (OBLIGATOIRE) :
+- Bande dessinée franco-belge très lisible, style presse satirique.
+- Dessin cartoon propre et net, contours noirs épais.
+- Personnages caricaturaux avec GROS NEZ, sourcils marqués, expressions exagérées.
+- Visages très expressifs (sourires forcés, regards cyniques/ironiques).
+- Couleurs vives et contrastées (bleu, rouge, jaune), éclairage clair.
+- Composition propre : cases bien séparées par des bordures blanches.
+- Bulles de dialogue grandes, texte TRÈS lisible, en MAJUSCULES, en français.
+- Pas réaliste, pas photo, pas peinture.
+
+À ÉVITER ABSOLUMENT : photoréalisme, style peinture/aquarelle, texte illisible, gore, haine.
+
+FORMAT :
+- Planche unique en 1024x1024
+- Plusieurs cases (6 à 10), organisées de manière fluide et lisible.
+- Une idée claire par case.
+
+TON & SATIRE :
+- Satire politique claire et visible.
+- On se MOQUE du parti/courant politique et de sa communication.
+- Exagérer la langue de bois, les slogans creux, les promesses irréalistes.
+- Montrer le décalage entre le discours officiel et la réalité quotidienne.
+- Humour ironique, absurde, mordant mais compréhensible par tous.
+- Règles de sécurité : pas de haine, pas d’insultes, pas d’attaques sur des caractéristiques protégées.
+  On caricature les idées et le storytelling politique, pas des personnes privées.
+
+PARTI / COURANT : {{party}}
+{{angle}}
+MISE EN SCÈNE RECOMMANDÉE (à varier) :
+- Meeting politique avec drapeaux, foule enthousiaste, slogans.
+- Coulisses (bureau / salon feutré) où le discours change.
+- Citoyens (supermarché, factures, travail) qui subissent la réalité.
+- Dernière case : chute satirique très claire (panneau absurde, retournement, punchline).
+
+DIALOGUES (OBLIGATOIRE) :
+- Bulles courtes, percutantes, en MAJUSCULES.
+- Ton politique simpliste et volontairement excessif.
+- Exemple de ton (à adapter) : « NOUS PRENONS LE CONTRÔLE ! », « LA RICHESSE POUR LE PEUPLE ! », « C’EST NOUS QUI DÉCIDONS ! »
+
+THÈMES DOMINANTS À INTÉGRER :
+{{themes}}
+MATIÈRE D’INSPIRATION (utiliser ces extraits comme base d'idées, sans copier mot à mot) :
+{{quotes}}
+IMPORTANT :
+- Utiliser les extraits pour nourrir les idées de chaque case.
+- Faire ressortir au moins 2 contradictions ou décalages.
+- Finir par une chute satirique visible et drôle.
+- Garder un dessin lisible et des bulles lisibles.
+"""
+
+_SLOT = re.compile(r"\{\{(\w+)\}\}")
+
+
+class CompiledTemplate:
+    """Gabarit découpé une seule fois en segments littéraux et emplacements."""
+
+    def __init__(self, text):
+        self.parts = []   # alternance : littéral, nom d'emplacement, littéral, ...
+        pos = 0
+        for m in _SLOT.finditer(text):
+            self.parts.append(text[pos:m.start()])
+            self.parts.append(m.group(1))
+            pos = m.end()
+        self.parts.append(text[pos:])
+        self.slots = self.parts[1::2]
+        # Longueur fixe (hors emplacements), utile pour les budgets de caractères
+        self.fixed_len = sum(len(p) for p in self.parts[0::2])
+
+    def render(self, **values):
+        out = self.parts[:]
+        for i in range(1, len(out), 2):
+            out[i] = values[out[i]]
+        return "".join(out)
+
+
+BD_PROMPT = CompiledTemplate(BD_TEMPLATE)
+
+
+def variant_seed(*parts):
+    """Graine stable (indépendante de PYTHONHASHSEED) à partir de parties quelconques."""
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+class PromptResult:
+    def __init__(self, prompt, pack=None, no_quotes=False):
+        self.prompt = prompt
+        self.pack = pack    # PackResult (extraits gardés / écartés), None si pas de budget
+        self.no_quotes = no_quotes  # aucune phrase : prompt = NO_QUOTES_MESSAGE, à ne pas envoyer
+
+
+def quote_line(theme, quote):
+    return f"- [{theme}] {quote}\n"
+
+
+class PromptEngine:
+    """
+    Génération de prompts BD à partir des résultats d'analyse.
+
+    Chaque appel utilise sa propre instance random.Random (aucun état global
+    partagé entre sessions) ; le gabarit est compilé une seule fois. Les
+    extraits sont ensuite choisis pour tenir exactement dans `budget`
+    caractères (sac à dos, équilibré entre thèmes) au lieu d'être tronqués.
+    """
+
+    def __init__(self, template=BD_PROMPT, max_top_themes=8, budget=PROMPT_MAX_CHARS):
+        self.template = template
+        self.max_top_themes = max_top_themes
+        self.budget = budget
+
+    @staticmethod
+    def prepare_pools(analysis_results):
+        """Phrases nettoyées par thème, dans l'ordre de l'analyse."""
+        pools = []
+        for (theme, score, phrases) in (analysis_results or []):
+            clean_phrases = [p.strip() for p in (phrases or []) if isinstance(p, str) and p.strip()]
+            if clean_phrases:
+                pools.append((theme, score, clean_phrases))
+        return pools
+
+    @staticmethod
+    def select_quotes(pools, rng, max_quotes):
+        """
+        Sélection aléatoire mais équilibrée (round-robin entre thèmes, par score
+        décroissant). Chaque tirage est O(1) : liste mélangée puis inversée, on
+        dépile par la fin.
+        """
+        stacks = []
+        for theme, score, phrases in pools:
+            stack = phrases[:]
+            rng.shuffle(stack)
+            stack.reverse()
+            stacks.append((theme, score, stack))
+        stacks.sort(key=lambda x: x[1], reverse=True)
+        active = deque((theme, stack) for theme, _, stack in stacks)
+        selected = []
+        while active and len(selected) < max_quotes:
+            theme, stack = active.popleft()
+            selected.append((theme, stack.pop()))
+            if stack:
+                active.append((theme, stack))
+        return selected
+
+    def render(self, party_name, angle_satirique, top_themes, selected):
+        return self.template.render(quotes="".join(quote_line(t, q) for t, q in selected),
+                                    **self._fixed_slots(party_name, angle_satirique, top_themes))
+
+    @staticmethod
+    def _fixed_slots(party_name, angle_satirique, top_themes):
+        return {
+            "party": party_name,
+            "angle": f"ANGLE SATIRIQUE PRIORITAIRE : {angle_satirique}\n" if angle_satirique else "",
+            "themes": "".join(f"- {t}\n" for t in top_themes),
+        }
+
+    def build(self, party_name, analysis_results, angle_satirique="", max_quotes=60, seed=None, pools=None, budget=None):
+        """Comme generate, mais renvoie aussi le détail du remplissage (PromptResult)."""
+        if pools is None:
+            pools = self.prepare_pools(analysis_results)
+        if not pools:
+            return PromptResult(NO_QUOTES_MESSAGE, no_quotes=True)
+        rng = random.Random(seed)
+        selected = self.select_quotes(pools, rng, max_quotes)
+        top_themes = [t for (t, _, _) in sorted(pools, key=lambda x: x[1], reverse=True)][:self.max_top_themes]
+        budget = self.budget if budget is None else budget
+        pack = None
+        if budget:
+            fixed = self.template.fixed_len + sum(len(v) for v in self._fixed_slots(party_name, angle_satirique, top_themes).values())
+            values = default_values(selected, {t: s for t, s, _ in pools})
+            pack = pack_quotes(selected, budget - fixed, lambda t, q: len(quote_line(t, q)), values)
+            selected = pack.selected
+        return PromptResult(self.render(party_name, angle_satirique, top_themes, selected), pack)
+
+    def generate(self, party_name, analysis_results, angle_satirique="", max_quotes=60, seed=None, pools=None, budget=None):
+        return self.build(party_name, analysis_results, angle_satirique, max_quotes, seed, pools, budget).prompt
+
+    def generate_variants(self, analyses, angles=("",), n=1, base_seed=0, max_quotes=60):
+        """
+        Variantes reproductibles en masse, pour l'A/B testing de prompts.
+
+        analyses : {parti: analysis_results}
+        angles : liste d'angles satiriques (ex. [ANGLE_SATIRIQUE, ...])
+        Produit des dicts {party, angle, variant, seed, prompt} ; la graine de
+        chaque variante ne dépend que de (base_seed, parti, angle, numéro).
+        """
+        for party, results in analyses.items():
+            pools = self.prepare_pools(results)   # nettoyage une seule fois par parti
+            for angle in angles:
+                for i in range(n):
+                    seed = variant_seed(base_seed, party, angle, i)
+                    yield {
+                        "party": party, "angle": angle, "variant": i, "seed": seed,
+                        "prompt": self.generate(party, None, angle, max_quotes, seed, pools=pools),
+                    }
+
+
+DEFAULT_ENGINE = PromptEngine()
+
+
+@traced("prompt")
+def generate_bd_prompt(party_name, analysis_results, angle_satirique="", max_quotes=60, seed=None):
+    return DEFAULT_ENGINE.generate(party_name, analysis_results, angle_satirique, max_quotes, seed)
+
+
+@traced("prompt")
+def build_bd_prompt(party_name, analysis_results, angle_satirique="", max_quotes=60, seed=None):
+    """PromptResult : prompt + extraits gardés/écartés pour tenir dans PROMPT_MAX_CHARS."""
+    return DEFAULT_ENGINE.build(party_name, analysis_results, angle_satirique, max_quotes, seed)
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+
+
+class PackResult:
+    """Résultat du remplissage : extraits gardés, extraits écartés, budget."""
+
+    def __init__(self, selected, dropped, used, budget):
+        self.selected = selected    # [(theme, quote)] dans l'ordre d'origine
+        self.dropped = dropped      # [(theme, quote)] écartés faute de place
+        self.used = used            # caractères consommés par les extraits
+        self.budget = budget
+
+    @property
+    def dropped_themes(self):
+        kept = {t for t, _ in self.selected}
+        return sorted({t for t, _ in self.dropped if t not in kept})
+
+    def summary(self):
+        if not self.dropped:
+            return f"{len(self.selected)} extraits, {self.used}/{self.budget} caractères."
+        return (f"{len(self.selected)} extraits gardés, {len(self.dropped)} écartés "
+                f"({self.used}/{self.budget} caractères).")
+
+
+def default_values(items, theme_scores=None):
+    """
+    Valeur de chaque extrait : poids du thème (score relatif) et rendement
+    décroissant avec le rang dans le thème, pour équilibrer entre thèmes.
+    """
+    theme_scores = theme_scores or {}
+    top = max(theme_scores.values(), default=0) or 1
+    rank = {}
+    values = []
+    for theme, _ in items:
+        r = rank.get(theme, 0)
+        rank[theme] = r + 1
+        weight = 1.0 + theme_scores.get(theme, 0) / top
+        values.append(weight / (1 + r))
+    return values
+
+
+def pack_quotes(items, budget, line_cost, values=None, group_cost=None):
+    """
+    Choisit le sous-ensemble d'extraits de valeur totale maximale dont le coût
+    (en caractères) tient dans `budget` : sac à dos 0/1 exact, par groupes.
+
+    items : [(theme, quote)]
+    line_cost(theme, quote) -> coût de la ligne de l'extrait
+    group_cost(theme) -> coût fixe payé une fois si au moins un extrait du
+        thème est gardé (ex. un titre de section) ; None = aucun
+    """
+    budget = max(0, int(budget))
+    if values is None:
+        values = default_values(items)
+    groups = OrderedDict()
+    for i, (theme, _) in enumerate(items):
+        groups.setdefault(theme, []).append(i)
+    costs = [line_cost(t, q) for t, q in items]
+
+    # dp[c] = meilleure valeur pour un coût <= c
+    dp = [0.0] * (budget + 1)
+    group_taken = []
+    item_taken = {}
+    for theme, idxs in groups.items():
+        header = group_cost(theme) if group_cost else 0
+        # tmp : le titre du groupe est payé, puis 0/1 sur ses extraits
+        tmp = [float("-inf")] * (budget + 1)
+        for c in range(header, budget + 1):
+            tmp[c] = dp[c - header]
+        for i in idxs:
+            cost, val = costs[i], values[i]
+            taken = bytearray(budget + 1)
+            for c in range(budget, cost - 1, -1):
+                cand = tmp[c - cost] + val
+                if cand > tmp[c]:
+                    tmp[c] = cand
+                    taken[c] = 1
+            item_taken[i] = taken
+        took = bytearray(budget + 1)
+        for c in range(budget + 1):
+            if tmp[c] > dp[c] + 1e-12:
+                dp[c] = tmp[c]
+                took[c] = 1
+        group_taken.append((theme, idxs, header, took))
+
+    # Reconstruction en remontant les groupes et extraits
+    chosen = set()
+    c = budget
+    for theme, idxs, header, took in reversed(group_taken):
+        if not took[c]:
+            continue
+        for i in reversed(idxs):
+            if item_taken[i][c]:
+                chosen.add(i)
+                c -= costs[i]
+        c -= header
+
+    selected = [items[i] for i in range(len(items)) if i in chosen]
+    dropped = [items[i] for i in range(len(items)) if i not in chosen]
+    used = sum(costs[i] for i in chosen)
+    used += sum(group_cost(t) for t in {items[i][0] for i in chosen}) if group_cost else 0
+    return PackResult(selected, dropped, used, budget)
@@ -0,0 +1,312 @@
+"""
+Rafraîchissement périodique et incrémental des sources de PARTY_URLS.
+
+Chaque page est revalidée (requête conditionnelle), découpée en paragraphes
+(blocs HTML), et les empreintes des paragraphes sont comparées au snapshot
+précédent : seuls les paragraphes nouveaux ou modifiés sont tokenisés et
+scorés. Scores de thèmes et phrases d'exemple sont ensuite recombinés à
+partir des analyses par paragraphe, et l'analyse du parti est enregistrée
+pour être servie telle quelle par l'interface.
+
+    python refresh.py --once
+    python refresh.py --interval 3600 --party rn lfi
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from http_cache import CACHE_DIR, open_db
+
+# Période du démon (secondes) ; 0 = pas de rafraîchissement automatique dans l'app
+REFRESH_INTERVAL = int(os.getenv("REFRESH_INTERVAL", 0))
+REFRESH_DB = os.getenv("REFRESH_DB", os.path.join(CACHE_DIR, "refresh.sqlite"))
+
+
+def paragraph_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def analyse_paragraph(text, min_len=30, max_len=300):
+    """
+    Analyse d'un paragraphe, sérialisable en JSON : scores de thèmes, stats
+    BM25 (phrases, longueur, df) et phrases candidates avec leurs termes.
+    """
+    from scraper import SENTENCE_INDEXER, clean_tokens, score_themes
+
+    scores, _ = score_themes(clean_tokens(text))
+    index = SENTENCE_INDEXER.index(text)
+    themes_of = {}
+    for theme, ids in index.postings.items():
+        for i in ids:
+            themes_of.setdefault(i, []).append(theme)
+    sentences = []
+    for i in sorted(themes_of):
+        s = index.sentence(i)
+        if min_len < len(s) < max_len:
+            sentences.append([s, dict(index.terms[i]), index.lengths[i], themes_of[i]])
+    return {
+        "scores": {t: s for t, s in scores.items() if s},
+        "n": index.stats.n,
+        "total_len": index.stats.total_len,
+        "df": dict(index.stats.df),
+        "sentences": sentences,
+    }
+
+
+def combine(analyses, max_ex=8):
+    """
+    Résultats [(theme, score, [phrases])] à partir des analyses de
+    paragraphes (dans l'ordre de la page) : scores additionnés, statistiques
+    BM25 fusionnées, puis classement des candidates sans re-tokeniser.
+    """
+    from bm25 import TermStats, TopK
+    from near_dup import NearDuplicateFilter
+    from scraper import SENTENCE_INDEXER, SENTENCE_RANKING, THEMES_DEFINITIONS
+    from sentence_index import OVERSAMPLE, select_ranked
+
+    scores = Counter()
+    stats = TermStats()
+    for a in analyses:
+        scores.update(a["scores"])
+        stats.n += a["n"]
+        stats.total_len += a["total_len"]
+        stats.df.update(a["df"])
+
+    examples = {}
+    if SENTENCE_RANKING == "bm25":
+        heaps = {t: TopK(max_ex * OVERSAMPLE) for t in THEMES_DEFINITIONS}
+        for a in analyses:
+            for text, terms, length, themes in a["sentences"]:
+                for th in themes:
+                    heaps[th].push(stats.score(terms, length, SENTENCE_INDEXER.queries[th]), text)
+        examples = {t: select_ranked(heaps[t], max_ex, NearDuplicateFilter()) for t in THEMES_DEFINITIONS}
+    else:
+        dedup = {t: NearDuplicateFilter() for t in THEMES_DEFINITIONS}
+        for t in THEMES_DEFINITIONS:
+            examples[t] = []
+        for a in analyses:
+            for text, _, _, themes in a["sentences"]:
+                for th in themes:
+                    if len(examples[th]) < max_ex and dedup[th].add(text):
+                        examples[th].append(text)
+    sorted_themes = sorted([(t, scores[t]) for t in THEMES_DEFINITIONS if scores[t] > 0], key=lambda x: x[1], reverse=True)
+    return [(t, sc, examples[t]) for t, sc in sorted_themes if examples[t]]
+
+
+class RefreshStore:
+    """
+    État du rafraîchissement (SQLite) : empreintes des paragraphes de chaque
+    source (le snapshot précédent), analyses par paragraphe (adressées par
+    empreinte, partagées entre pages) et dernière analyse de chaque parti.
+
+    Les analyses dépendent de la configuration (lexique, filtres, classement) :
+    si son empreinte a changé depuis l'écriture, elles sont effacées à
+    l'ouverture et seront recalculées au prochain passage.
+    """
+
+    def __init__(self, path=REFRESH_DB, config=None):
+        if config is None:
+            from scraper import analysis_config
+            config = analysis_config()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = open_db(path)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS paragraphs (hash TEXT PRIMARY KEY, analysis TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS sources (url TEXT PRIMARY KEY, party TEXT NOT NULL, hashes TEXT NOT NULL, checked_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS party_analyses (
+                party TEXT PRIMARY KEY, results TEXT NOT NULL, updated_at REAL NOT NULL, checked_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        with self._db:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+            if row is None or row[0] != config:
+                self._db.execute("DELETE FROM paragraphs")
+                self._db.execute("DELETE FROM party_analyses")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('config', ?)", (config,))
+        self.config = config
+
+    def source_hashes(self, url):
+        with self._lock:
+            row = self._db.execute("SELECT hashes FROM sources WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def paragraphs(self, hashes):
+        """{empreinte: analyse} pour celles déjà connues."""
+        found = {}
+        hashes = list(set(hashes))
+        with self._lock:
+            for k in range(0, len(hashes), 500):
+                chunk = hashes[k:k + 500]
+                marks = ",".join("?" * len(chunk))
+                for h, a in self._db.execute(f"SELECT hash, analysis FROM paragraphs WHERE hash IN ({marks})", chunk):
+                    found[h] = json.loads(a)
+        return found
+
+    def save_source(self, party, url, hashes, new_analyses):
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO paragraphs VALUES (?, ?)",
+                                 [(h, json.dumps(a, ensure_ascii=False)) for h, a in new_analyses.items()])
+            self._db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                             (url, party, json.dumps(hashes), time.time()))
+
+    def save_party(self, party, results, changed):
+        now = time.time()
+        with self._lock, self._db:
+            if changed or not self._db.execute("SELECT 1 FROM party_analyses WHERE party = ?", (party,)).fetchone():
+                self._db.execute("INSERT OR REPLACE INTO party_analyses VALUES (?, ?, ?, ?)",
+                                 (party, json.dumps(results, ensure_ascii=False), now, now))
+            else:
+                self._db.execute("UPDATE party_analyses SET checked_at = ? WHERE party = ?", (now, party))
+
+    def party_analysis(self, party):
+        """(résultats [(theme, score, [phrases])], dernière modification, dernière vérification) ou None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT results, updated_at, checked_at FROM party_analyses WHERE party = ?", (party,)
+            ).fetchone()
+        if row is None:
+            return None
+        return [tuple(r) for r in json.loads(row[0])], row[1], row[2]
+
+    def prune(self):
+        """Supprime les analyses de paragraphes qui ne sont plus dans aucune source."""
+        with self._lock, self._db:
+            live = set()
+            for (hashes,) in self._db.execute("SELECT hashes FROM sources"):
+                live.update(json.loads(hashes))
+            stale = [(h,) for (h,) in self._db.execute("SELECT hash FROM paragraphs") if h not in live]
+            self._db.executemany("DELETE FROM paragraphs WHERE hash = ?", stale)
+        return len(stale)
+
+
+class Refresher:
+    """Rafraîchit les partis ; `start()` lance la boucle périodique dans un thread."""
+
+    def __init__(self, party_urls=None, interval=REFRESH_INTERVAL or 3600, store=None, log_callback=None):
+        if party_urls is None:
+            from config import PARTY_URLS
+            party_urls = PARTY_URLS
+        self.party_urls = party_urls
+        self.interval = interval
+        self.store = store or RefreshStore()
+        self.log = log_callback or (lambda msg, level="info": print(f"{level.upper()} {msg}"))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh_source(self, party, url):
+        """
+        Revalide une page et met à jour son snapshot de paragraphes.
+        Renvoie (analyses des paragraphes dans l'ordre, texte complet, modifiée ?, nb nouveaux).
+        """
+        from http_cache import get_cache
+        from stream_extract import iter_text_blocks
+
+        html = get_cache().fetch(url, max_age=0)   # requête conditionnelle (304 si inchangée)
+        blocks = list(iter_text_blocks([html]))
+        hashes = [paragraph_hash(b) for b in blocks]
+        previous = self.store.source_hashes(url)
+        known = self.store.paragraphs(hashes)
+        new = {}
+        for h, block in zip(hashes, blocks):
+            if h not in known and h not in new:
+                new[h] = analyse_paragraph(block)
+        changed = previous != hashes
+        if changed or new:
+            self.store.save_source(party, url, hashes, new)
+        known.update(new)
+        return [known[h] for h in hashes], " ".join(blocks), changed, len(new)
+
+    def refresh_party(self, party, urls, log_callback=None):
+        """Rafraîchit les pages d'un parti ; renvoie ses résultats [(theme, score, [phrases])] ou None."""
+        from scraper import store_snapshot
+
+        log = log_callback or self.log
+        analyses, texts, changed, n_new, n_total = [], [], False, 0, 0
+        for url in urls:
+            try:
+                a, text, c, n = self.refresh_source(party, url)
+            except Exception as e:
+                log(f"[Refresh] {party} : {url} inaccessible ({e}), snapshot précédent conservé.", "warning")
+                prev = self.store.source_hashes(url)
+                if prev is None:
+                    continue
+                known = self.store.paragraphs(prev)
+                a, text, c, n = [known[h] for h in prev if h in known], "", False, 0
+            analyses.extend(a)
+            if text:
+                texts.append(text)
+            changed |= c
+            n_new += n
+            n_total += len(a)
+        if not analyses:
+            return None
+        stored = self.store.party_analysis(party)
+        if changed or stored is None:
+            results = combine(analyses)
+            self.store.save_party(party, results, True)
+            if texts:
+                store_snapshot(party, urls, " ".join(texts))   # historique du corpus
+        else:
+            results = stored[0]
+            self.store.save_party(party, results, False)
+        log(f"[Refresh] {party} : {n_new} paragraphe(s) ré-analysé(s) sur {n_total}"
+                 f"{'' if changed else ' (inchangé)'}.", "success")
+        return results
+
+    def run_once(self, parties=None):
+        out = {}
+        for party in parties or self.party_urls:
+            out[party] = self.refresh_party(party, self.party_urls[party])
+        pruned = self.store.prune()
+        if pruned:
+            self.log(f"[Refresh] {pruned} analyse(s) de paragraphes obsolètes supprimée(s).", "info")
+        return out
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self.log(f"[Refresh] Erreur : {e}", "error")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="refresh")
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Rafraîchissement incrémental des programmes (PARTY_URLS).")
+    parser.add_argument("--party", nargs="*", help="Codes des partis (défaut : tous).")
+    parser.add_argument("--interval", type=int, default=REFRESH_INTERVAL or 3600, help="Période en secondes.")
+    parser.add_argument("--once", action="store_true", help="Un seul passage puis sortie.")
+    args = parser.parse_args(argv)
+
+    refresher = Refresher(interval=args.interval)
+    if args.once:
+        refresher.run_once(args.party)
+        return 0
+    try:
+        while True:
+            refresher.run_once(args.party)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
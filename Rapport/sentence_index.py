@@ -0,0 +1,140 @@
+import re
+from collections import Counter
+
+from bm25 import TermStats, TopK
+
+# Même découpage que l'ancien get_sentences_for_theme (benchmark.py) : après . ? ! suivi d'espaces
+SENTENCE_BOUNDARY = re.compile(r'(?<=[\.\?\!])\s+')
+# Candidats gardés par thème (x max_ex) avant l'élimination des quasi-doublons
+OVERSAMPLE = 3
+
+
+class SentenceIndex:
+    """
+    Index phrase -> thèmes construit en une seule passe sur le texte.
+
+    Les phrases ne sont pas copiées : on garde des offsets (début, fin)
+    dans le texte partagé, et pour chaque thème la liste des numéros de
+    phrases qui contiennent au moins un de ses mots-clés.
+    """
+
+    def __init__(self, text, spans, postings, terms=None, lengths=None, stats=None, queries=None):
+        self.text = text
+        self.spans = spans          # [(start, end)] des phrases (sans espaces autour)
+        self.postings = postings    # {thème: [indice de phrase]}
+        self.terms = terms          # [{mot-clé: tf}] par phrase indexée
+        self.lengths = lengths      # [nombre de mots] par phrase indexée
+        self.stats = stats          # TermStats de toutes les phrases du texte
+        self.queries = queries      # {thème: ensemble de ses mots-clés}
+
+    def sentence(self, i):
+        start, end = self.spans[i]
+        return self.text[start:end]
+
+    def examples(self, theme, max_ex=8, min_len=30, max_len=300, dedup=None):
+        """
+        Exemples d'un thème, dans l'ordre du document, sans doublons.
+        dedup : NearDuplicateFilter optionnel pour écarter aussi les quasi-doublons
+        (bannières, menus répétés avec de légères variantes).
+        """
+        examples = []
+        seen = set()
+        for i in self.postings.get(theme, ()):
+            start, end = self.spans[i]
+            if not (min_len < end - start < max_len):
+                continue
+            s = self.text[start:end]
+            if s in seen:
+                continue
+            seen.add(s)
+            if dedup is not None and not dedup.add(s):
+                continue
+            examples.append(s)
+            if len(examples) >= max_ex:
+                break
+        return examples
+
+    def push_ranked(self, theme, heap, min_len=30, max_len=300, stats=None):
+        """
+        Score BM25 (mots-clés du thème) de chaque phrase candidate et ajout au
+        tas borné `heap`. stats : statistiques à utiliser (celles du texte par
+        défaut ; en streaming, les statistiques cumulées des blocs déjà lus).
+        """
+        stats = stats or self.stats
+        query = self.queries[theme]
+        for i in self.postings.get(theme, ()):
+            start, end = self.spans[i]
+            if min_len < end - start < max_len:
+                heap.push(stats.score(self.terms[i], self.lengths[i], query), self.text[start:end])
+
+    def ranked(self, theme, max_ex=8, min_len=30, max_len=300, dedup=None):
+        """Les max_ex phrases les plus pertinentes (BM25) du thème, de la meilleure à la moins bonne."""
+        heap = TopK(max_ex * OVERSAMPLE)
+        self.push_ranked(theme, heap, min_len, max_len)
+        return select_ranked(heap, max_ex, dedup)
+
+
+def select_ranked(heap, max_ex=8, dedup=None):
+    """Parcourt le tas par score décroissant en écartant les quasi-doublons."""
+    out = []
+    for s in heap.items():
+        if dedup is not None and not dedup.add(s):
+            continue
+        out.append(s)
+        if len(out) >= max_ex:
+            break
+    return out
+
+
+class SentenceIndexer:
+    """Regex des mots-clés compilée une seule fois pour tous les thèmes."""
+
+    def __init__(self, themes_definitions):
+        self.themes = list(themes_definitions.keys())
+        self.queries = {t: frozenset(kws) for t, kws in themes_definitions.items()}
+        self._kw_themes = {}
+        for theme, kws in themes_definitions.items():
+            for k in kws:
+                self._kw_themes.setdefault(k, []).append(theme)
+        # Mots-clés les plus longs d'abord pour ne pas masquer un mot composé
+        alternatives = sorted(self._kw_themes, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(" + "|".join(re.escape(k) for k in alternatives) + r")\b")
+
+    def _sentence_spans(self, text):
+        start = 0
+        for m in SENTENCE_BOUNDARY.finditer(text):
+            yield start, m.start()
+            start = m.end()
+        yield start, len(text)
+
+    def index(self, text):
+        """
+        Une passe : phrases, thèmes, et statistiques BM25 (tf des mots-clés
+        par phrase, longueurs, df) pour le classement par pertinence.
+        """
+        spans = []
+        postings = {t: [] for t in self.themes}
+        terms = []
+        lengths = []
+        stats = TermStats()
+        for start, end in self._sentence_spans(text):
+            # équivalent de s.strip(), mais sur les offsets
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start == end:
+                continue
+            sentence = text[start:end].lower()
+            tf = Counter(m.group(1) for m in self._pattern.finditer(sentence))
+            length = len(sentence.split())
+            stats.add_sentence(length, tf)
+            if not tf:
+                continue
+            i = len(spans)
+            spans.append((start, end))
+            terms.append(tf)
+            lengths.append(length)
+            for t in {t for kw in tf for t in self._kw_themes[kw]}:
+                postings[t].append(i)
+        return SentenceIndex(text, spans, postings, terms, lengths, stats, self.queries)
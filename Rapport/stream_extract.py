@@ -0,0 +1,124 @@
+import os
+import re
+
+from lxml import etree
+
+from http_client import get_session, TIMEOUT
+
+# Plafond dur d'octets lus par page en mode streaming
+STREAM_MAX_BYTES = int(os.getenv("STREAM_MAX_BYTES", 8 * 1024 * 1024))
+CHUNK_SIZE = 64 * 1024
+# Au-delà, un bloc de texte est émis même sans balise de fin (mémoire bornée),
+# coupé après la dernière fin de phrase (à défaut le dernier espace)
+MAX_BLOCK_CHARS = 32 * 1024
+
+SKIP_TAGS = {"script", "style", "nav", "footer"}
+BLOCK_TAGS = {
+    "p", "div", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "br",
+    "td", "th", "tr", "table", "section", "article", "header", "main", "aside",
+    "blockquote", "pre", "title", "dd", "dt", "form", "figcaption",
+}
+
+_WS = re.compile(r"\s+")
+_SENTENCE_END = re.compile(r"[\.\?\!]\s")
+
+
+class _BlockCollector:
+    """Cible du parseur lxml : aucun arbre n'est construit, seul le texte est gardé."""
+
+    def __init__(self):
+        self.skip_depth = 0
+        self.buf = []
+        self.buf_len = 0
+        self.blocks = []
+
+    def _flush(self):
+        if self.buf:
+            self._emit("".join(self.buf))
+            self.buf = []
+            self.buf_len = 0
+
+    def _emit(self, raw):
+        text = _WS.sub(" ", raw).strip()
+        if text:
+            self.blocks.append(text)
+
+    def _flush_long(self):
+        """Bloc trop long : émet jusqu'à la dernière fin de phrase, garde la suite."""
+        raw = "".join(self.buf)
+        cut = None
+        for m in _SENTENCE_END.finditer(raw):
+            cut = m.end()
+        if cut is None:
+            for m in _WS.finditer(raw):
+                cut = m.end()
+        if not cut:
+            cut = len(raw)   # un seul « mot » géant : coupé tel quel
+        self._emit(raw[:cut])
+        rest = raw[cut:]
+        self.buf = [rest] if rest else []
+        self.buf_len = len(rest)
+
+    def start(self, tag, attrib):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def end(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def data(self, data):
+        if self.skip_depth:
+            return
+        self.buf.append(data)
+        self.buf_len += len(data)
+        if self.buf_len >= MAX_BLOCK_CHARS:
+            self._flush_long()
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        self._flush()
+
+
+def iter_text_blocks(chunks, max_bytes=STREAM_MAX_BYTES, encoding=None):
+    """
+    Parse incrémentalement des morceaux de HTML (bytes ou str) et produit des
+    blocs de texte normalisés, en sautant script/style/nav/footer.
+    La lecture s'arrête après max_bytes.
+    """
+    collector = _BlockCollector()
+    parser = etree.HTMLParser(target=collector, encoding=encoding)
+    read = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if read + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - read]
+        read += len(chunk)
+        parser.feed(chunk)
+        if collector.blocks:
+            yield from collector.blocks
+            collector.blocks = []
+        if read >= max_bytes:
+            break
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        pass
+    collector._flush()
+    yield from collector.blocks
+
+
+def stream_text_blocks(url, max_bytes=STREAM_MAX_BYTES):
+    """Télécharge une page par morceaux et produit ses blocs de texte."""
+    with get_session().get(url, stream=True, timeout=TIMEOUT) as r:
+        r.raise_for_status()
+        # r.encoding vient de l'en-tête Content-Type ; sinon lxml détecte (meta charset)
+        encoding = r.encoding if "charset" in r.headers.get("Content-Type", "").lower() else None
+        yield from iter_text_blocks(r.iter_content(CHUNK_SIZE), max_bytes=max_bytes, encoding=encoding)
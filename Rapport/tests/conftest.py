@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# Modules à plat dans Rapport/ ; caches et corpus dans un dossier jetable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("HTTP_CACHE_DIR", tempfile.mkdtemp(prefix="rapport-tests-"))
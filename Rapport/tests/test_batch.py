@@ -0,0 +1,13 @@
+from batch import run_job
+from prompt_engine import NO_QUOTES_MESSAGE, build_bd_prompt
+
+
+def test_no_quotes_is_an_error_not_a_prompt():
+    built = build_bd_prompt("Parti Test", [])
+    assert built.no_quotes and built.prompt == NO_QUOTES_MESSAGE
+
+    job = {"name": "demo", "code": "url0", "urls": ["https://demo.example/a"], "depth": 0, "angle": "",
+           "seed": 0, "prompt_variants": 0, "angles": [""], "store": False, "from_corpus": False}
+    record = run_job(job)
+    assert record["error"]
+    assert "prompt" not in record
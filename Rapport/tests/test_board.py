@@ -0,0 +1,42 @@
+import pytest
+
+from board import BoardPipeline
+from image_provider import ContentFilterError, DummyProvider
+from jobs import JobCancelled
+
+SELECTED = [("SÉCURITÉ & JUSTICE", "Nous voulons renforcer la police dans les quartiers."),
+            ("ÉDUCATION & FAMILLE", "L'école publique recrutera des enseignants.")]
+
+
+class RefusingProvider:
+    """Refuse le prompt normal (sans « content_filter » dans le message), accepte le prudent."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_image(self, prompt, log_callback=None):
+        self.prompts.append(prompt)
+        if "presse satirique" in prompt:
+            raise ContentFilterError("Azure n'a renvoyé ni URL ni image. Raison possible : Filtre de contenu (Content Filter).")
+        return DummyProvider.placeholder()
+
+
+def test_filtered_panels_are_retried_with_the_safe_prompt():
+    provider = RefusingProvider()
+    pipeline = BoardPipeline(provider, rate_per_minute=6000)
+    png, panels = pipeline.generate_board("Parti Test", SELECTED, n_panels=2)
+    pipeline.shutdown()
+    assert png.startswith(b"\x89PNG")
+    assert all(p.image is not None and p.attempts == 2 for p in panels)
+    assert sum("presse satirique" not in prompt for prompt in provider.prompts) == 2
+
+
+def test_cancelling_stops_the_board():
+    def log(msg, level="info"):
+        if "Case" in msg:
+            raise JobCancelled("job")
+
+    pipeline = BoardPipeline(DummyProvider(), rate_per_minute=6000)
+    with pytest.raises(JobCancelled):
+        pipeline.generate_board("Parti Test", SELECTED, n_panels=2, log_callback=log)
+    pipeline.shutdown()
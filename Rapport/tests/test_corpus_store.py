@@ -0,0 +1,49 @@
+import corpus_store
+import scraper
+
+PAGE = (
+    "Nous voulons renforcer la police et la sécurité dans tous les quartiers. "
+    "L'école publique et les enseignants seront mieux payés dès la rentrée. "
+    "Le pouvoir d'achat des retraités augmentera chaque année."
+)
+
+
+def test_same_page_scraped_two_ways_is_not_double_counted(tmp_path, monkeypatch):
+    store = corpus_store.CorpusStore(str(tmp_path / "corpus.sqlite"))
+    monkeypatch.setattr(scraper, "get_store", lambda: store)
+    monkeypatch.setattr(scraper, "get_text", lambda url: PAGE)
+    monkeypatch.setattr(scraper, "get_corpus", lambda urls, **kw: PAGE)
+    url = "https://parti.example/programme"
+
+    direct = scraper.scrape_political_site(url, party="xx")
+    crawled = scraper.scrape_political_site([url + "/", url + "#mesures"], max_depth=1, party="xx")
+    assert direct == crawled
+
+    stored = store.analysis_for_party("xx")
+    assert [(t, sc) for t, sc, _ in stored] == [(t, sc) for t, sc, _ in direct]
+    for _, _, phrases in stored:
+        assert len(phrases) == len(set(phrases))
+
+
+def test_source_urls_are_normalised(tmp_path, monkeypatch):
+    store = corpus_store.CorpusStore(str(tmp_path / "corpus.sqlite"))
+    monkeypatch.setattr(scraper, "get_store", lambda: store)
+    scraper.store_snapshot("xx", "https://parti.example/programme/", PAGE)
+    scraper.store_snapshot("xx", "https://parti.example/programme#top", PAGE)
+    hits = store.search("police", party="xx")
+    assert {h["url"] for h in hits} == {"https://parti.example/programme"}
+    assert len(hits) == 1
+
+
+def test_unchanged_text_is_not_reanalysed(tmp_path, monkeypatch):
+    store = corpus_store.CorpusStore(str(tmp_path / "corpus.sqlite"))
+    monkeypatch.setattr(scraper, "get_store", lambda: store)
+    monkeypatch.setattr(scraper, "get_text", lambda url: PAGE + " Une phrase propre à ce test sur la police.")
+    calls = []
+    index = scraper.SENTENCE_INDEXER.index
+    monkeypatch.setattr(scraper.SENTENCE_INDEXER, "index", lambda text: calls.append(text) or index(text))
+
+    scraper.scrape_political_site("https://parti.example/unique", party="xx")
+    scraper.scrape_political_site("https://parti.example/unique", party="xx")
+    # Une seule indexation : celle de l'analyse, réutilisée par le corpus
+    assert len(calls) == 1
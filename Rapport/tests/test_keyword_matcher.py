@@ -0,0 +1,63 @@
+import random
+from collections import Counter
+
+import scraper
+from keyword_matcher import KeywordMatcher
+from scraper import THEMES_DEFINITIONS
+
+EDGE_TOKENS = ["sécu", "sécurité", "sécuritaire", "insécurité", "ue", "uefa",
+               "europe", "européen", "européennes", "u", "eu", "s", "sé", "police"]
+
+
+def old_score(tokens):
+    """Ancienne boucle de scraper.py (premier thème, premier mot-clé)."""
+    scores = {t: 0 for t in THEMES_DEFINITIONS}
+    keyword_hits = {t: Counter() for t in THEMES_DEFINITIONS}
+    for tok in tokens:
+        for theme, kws in THEMES_DEFINITIONS.items():
+            kw = next((k for k in kws if tok.startswith(k)), None)
+            if kw is not None:
+                scores[theme] += 1
+                keyword_hits[theme][kw] += 1
+                break
+    return scores, keyword_hits
+
+
+def random_tokens(n, seed=0):
+    rng = random.Random(seed)
+    kws = [k for kws in THEMES_DEFINITIONS.values() for k in kws]
+    suffixes = ["", "s", "e", "es", "ment", "aire", "ité", "fa", "en", "ne"]
+    filler = "abcdeéèfghilmnoprstu"
+    out = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.5:
+            out.append(rng.choice(kws) + rng.choice(suffixes))
+        elif r < 0.7:
+            kw = rng.choice(kws)
+            out.append(kw[:rng.randint(1, len(kw))])
+        else:
+            out.append("".join(rng.choice(filler) for _ in range(rng.randint(2, 9))))
+    return out
+
+
+def test_edge_tokens_match_old_loop():
+    assert KeywordMatcher(THEMES_DEFINITIONS).score(EDGE_TOKENS) == old_score(EDGE_TOKENS)
+    for tok in EDGE_TOKENS:
+        assert scraper.score_themes([tok]) == old_score([tok]), tok
+
+
+def test_random_corpus_matches_old_loop():
+    tokens = random_tokens(20_000) + EDGE_TOKENS
+    expected = old_score(tokens)
+    assert KeywordMatcher(THEMES_DEFINITIONS).score(tokens) == expected
+    # Deuxième passe : le cache token -> rang ne doit rien changer
+    assert scraper.THEME_MATCHER.score(tokens) == expected
+    assert scraper.THEME_MATCHER.score(tokens) == expected
+
+
+def test_cleaned_text_matches_old_loop():
+    text = ("La sécurité sociale et la Sécu ; l'UE, l'UEFA et l'Europe. "
+            "Les Européens votent, la police patrouille, l'insécurité recule.")
+    tokens = scraper.clean_tokens(text)
+    assert scraper.score_themes(tokens) == old_score(tokens)
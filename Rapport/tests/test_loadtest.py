@@ -0,0 +1,10 @@
+from loadtest import percentile
+
+
+def test_percentile_nearest_rank():
+    assert percentile(list(range(1, 21)), 95) == 19
+    assert percentile(list(range(1, 11)), 50) == 5
+    assert percentile(list(range(1, 11)), 99) == 10
+    assert percentile([3.0], 50) == 3.0
+    assert percentile(list(range(1, 11)), 0) == 1
+    assert percentile([], 50) is None
@@ -0,0 +1,65 @@
+from refresh import RefreshStore, analyse_paragraph, combine, paragraph_hash
+
+PARAGRAPH = "Nous voulons renforcer la police et la sécurité dans tous les quartiers de France."
+
+
+def test_analyses_are_dropped_when_the_config_changes(tmp_path):
+    path = str(tmp_path / "refresh.sqlite")
+    h = paragraph_hash(PARAGRAPH)
+    analysis = analyse_paragraph(PARAGRAPH)
+    store = RefreshStore(path, config="a")
+    store.save_source("xx", "https://parti.example", [h], {h: analysis})
+    store.save_party("xx", combine([analysis]), True)
+
+    same = RefreshStore(path, config="a")
+    assert same.paragraphs([h]) == {h: analysis}
+    assert same.party_analysis("xx") is not None
+
+    changed = RefreshStore(path, config="b")
+    assert changed.paragraphs([h]) == {}
+    assert changed.party_analysis("xx") is None
+    assert changed.source_hashes("https://parti.example") == [h]
+
+
+class FakeCache:
+    def __init__(self, html):
+        self.html = html
+
+    def fetch(self, url, request=None, max_age=None):
+        return self.html
+
+
+def page(n, changed=None):
+    paragraphs = [f"<p>Paragraphe {i}. Nous voulons renforcer la police et la sécurité dans le quartier {i}. "
+                  f"L'école publique recrutera des enseignants dans la commune {i}.</p>" for i in range(n)]
+    if changed is not None:
+        paragraphs[changed] = f"<p>Paragraphe {changed} modifié. Les impôts des familles baisseront en {changed}.</p>"
+    return "<html><body>" + "".join(paragraphs) + "</body></html>"
+
+
+def test_only_changed_paragraphs_are_reanalysed(tmp_path, monkeypatch):
+    import http_cache
+    import scraper
+    from refresh import Refresher
+    from stream_extract import iter_text_blocks
+
+    monkeypatch.setattr(scraper, "SENTENCE_RANKING", "document")
+    monkeypatch.setattr(scraper, "store_snapshot", lambda *a, **kw: None)
+    cache = FakeCache(page(20))
+    monkeypatch.setattr(http_cache, "get_cache", lambda: cache)
+    url = "https://parti.example/programme"
+    refresher = Refresher({"xx": [url]}, store=RefreshStore(str(tmp_path / "refresh.sqlite"), config="t"),
+                          log_callback=lambda msg, level="info": None)
+
+    _, _, changed, n_new = refresher.refresh_source("xx", url)
+    assert changed and n_new == 20
+    _, _, changed, n_new = refresher.refresh_source("xx", url)
+    assert not changed and n_new == 0
+
+    cache.html = page(20, changed=7)
+    _, _, changed, n_new = refresher.refresh_source("xx", url)
+    assert changed and n_new == 1
+
+    results = refresher.refresh_party("xx", [url])
+    assert results == scraper.analyse_stream(iter_text_blocks([cache.html]))
+    assert refresher.store.party_analysis("xx")[0] == results
@@ -0,0 +1,31 @@
+import scraper
+import stream_extract
+from stream_extract import iter_text_blocks
+
+PAGE = """<html><head><title>Programme.</title><style>p { color: red }</style></head><body>
+<nav>Accueil Contact</nav>
+<h1>Nos propositions pour la France.</h1>
+<p>Nous voulons renforcer la <b>police</b> et la sécurité dans les quartiers. Les peines seront appliquées.</p>
+<ul><li>L'école publique recrutera des enseignants dans chaque commune.</li>
+<li>Le pouvoir d'achat des retraités augmentera chaque année.</li></ul>
+<div><p>La transition écologique et le climat passent par le train.</p><p>Nous baisserons les impôts des familles.</p></div>
+<footer>Mentions légales</footer>
+</body></html>"""
+
+
+def test_stream_and_full_text_give_the_same_analysis(monkeypatch):
+    monkeypatch.setattr(scraper, "SENTENCE_RANKING", "document")
+    full = scraper._analyse_text(scraper.html_to_text(PAGE))
+    stream = scraper.analyse_stream(iter_text_blocks([PAGE]))
+    assert full
+    assert stream == full
+
+
+def test_long_blocks_are_cut_at_sentence_ends(monkeypatch):
+    monkeypatch.setattr(stream_extract, "MAX_BLOCK_CHARS", 100)
+    sentence = "Nous voulons renforcer la police et la sécurité dans les quartiers. "
+    html = "<p>" + "".join(f"<b>{w}</b> " for w in (sentence * 10).split()) + "</p>"
+    blocks = list(iter_text_blocks([html]))
+    assert len(blocks) > 1
+    assert all(b.endswith(".") for b in blocks)
+    assert " ".join(blocks) == (sentence * 10).strip()
@@ -0,0 +1,117 @@
+"""
+Analyse vectorisée de nombreux documents : matrice documents x mots-clés
+(ndarray NumPy dense), réduite en documents x thèmes. Parts de thèmes
+normalisées, pondération TF-IDF et écarts entre partis.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from instrumentation import span
+from scraper import THEME_MATCHER, clean_tokens, get_corpus
+
+
+class ThemeMatrix:
+    """
+    labels : étiquette de chaque document (ex. code du parti)
+    keyword_counts : documents x mots-clés (ndarray)
+    theme_counts : documents x thèmes (ndarray)
+    """
+
+    def __init__(self, labels, keyword_counts, matcher=THEME_MATCHER):
+        self.labels = list(labels)
+        self.themes = matcher.themes
+        self.keywords = [kw for kws in matcher.keywords for kw in kws]
+        self.keyword_counts = keyword_counts
+        self.keyword_theme = _keyword_theme_matrix(matcher)
+        self.theme_counts = keyword_counts @ self.keyword_theme
+
+    def shares(self, counts=None):
+        """Parts de chaque thème par document (lignes de somme 1, 0 si document vide)."""
+        counts = self.theme_counts if counts is None else counts
+        totals = counts.sum(axis=1, keepdims=True)
+        return np.divide(counts, totals, out=np.zeros_like(counts, dtype=float), where=totals > 0)
+
+    def tfidf(self):
+        """
+        TF-IDF par mot-clé (idf lissé : log((1 + n) / (1 + df)) + 1), sommé
+        par thème : un mot-clé présent dans tous les programmes pèse moins.
+        """
+        counts = self.keyword_counts
+        n = counts.shape[0]
+        df = (counts > 0).sum(axis=0)
+        idf = np.log((1 + n) / (1 + df)) + 1
+        return (counts * idf) @ self.keyword_theme
+
+    def by_label(self, values=None):
+        """Agrège les lignes par étiquette (plusieurs pages d'un même parti)."""
+        values = self.theme_counts if values is None else values
+        uniq = list(dict.fromkeys(self.labels))
+        rows = np.array([uniq.index(l) for l in self.labels])
+        out = np.zeros((len(uniq), values.shape[1]))
+        np.add.at(out, rows, values)
+        return uniq, out
+
+    def deltas(self):
+        """
+        Écarts de parts entre partis : deltas[a, b, t] = part(a, t) - part(b, t).
+        Renvoie (étiquettes, tableau partis x partis x thèmes).
+        """
+        labels, counts = self.by_label()
+        s = self.shares(counts)
+        return labels, s[:, None, :] - s[None, :, :]
+
+
+def _keyword_theme_matrix(matcher):
+    """Matrice 0/1 mots-clés x thèmes (colonnes dans l'ordre des thèmes)."""
+    theme_of = [ti for ti, kws in enumerate(matcher.keywords) for _ in kws]
+    m = np.zeros((len(theme_of), len(matcher.themes)))
+    m[np.arange(len(theme_of)), theme_of] = 1
+    return m
+
+
+def keyword_matrix(texts, matcher=THEME_MATCHER):
+    """
+    Compte des mots-clés par document, en une passe.
+
+    Les tokens distincts de tout le lot sont rattachés une seule fois à leur
+    mot-clé (même règle que KeywordMatcher.score) ; les comptes sont ensuite
+    calculés par NumPy (bincount) sans boucle Python par token.
+    """
+    offsets = [0]
+    for kws in matcher.keywords:
+        offsets.append(offsets[-1] + len(kws))
+    n_kw = offsets[-1]
+
+    vocab = {}
+    doc_ids = []
+    for text in texts:
+        tokens = clean_tokens(text)
+        doc_ids.append(np.fromiter((vocab.setdefault(t, len(vocab)) for t in tokens), dtype=np.int64, count=len(tokens)))
+    column = np.full(len(vocab), -1, dtype=np.int64)
+    for token, i in vocab.items():
+        rank = matcher.match(token)
+        if rank is not None:
+            column[i] = offsets[rank[0]] + rank[1]
+
+    counts = np.zeros((len(doc_ids), n_kw))
+    for r, ids in enumerate(doc_ids):
+        c = column[ids]
+        counts[r] = np.bincount(c[c >= 0], minlength=n_kw)
+    return counts
+
+
+def build_theme_matrix(documents, matcher=THEME_MATCHER):
+    """documents : itérable de (étiquette, texte)."""
+    documents = list(documents)
+    with span("theme_matrix", nbytes=sum(len(t) for _, t in documents)):
+        counts = keyword_matrix([t for _, t in documents], matcher)
+        return ThemeMatrix([l for l, _ in documents], counts, matcher)
+
+
+def fetch_party_documents(party_urls, max_depth=0, max_workers=8):
+    """Texte de chaque parti {code: [urls]}, téléchargés en parallèle -> [(code, texte)]."""
+    codes = list(party_urls)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(codes)))) as pool:
+        texts = pool.map(lambda c: get_corpus(party_urls[c], max_depth=max_depth), codes)
+        return [(c, t) for c, t in zip(codes, texts) if t]